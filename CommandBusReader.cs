@@ -0,0 +1,237 @@
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.IO;
+using System.Net.Sockets;
+using System.Text;
+using System.Threading;
+using Newtonsoft.Json;
+using Newtonsoft.Json.Linq;
+using UnityEngine;
+
+// 讀取 Python command_bus 發佈的訊息：連得上本機 socket 時即時接收，連不上時改讀備援 JSON 檔。
+// 每則訊息帶有 session 與遞增的 seq，處理過的不會重複執行；備援檔保留最近的多則訊息，
+// 連續兩則（例如玩家落子與 AI 落子）也不會互相覆蓋。沒有 messages 欄位的舊格式檔案則在內容改變時整份當成一則訊息。
+// 啟動前就存在的訊息：skipExisting 時全部略過，否則只執行此主題最新的一則（和只有一則指令的舊備援檔相同）。
+public class CommandBusReader : IDisposable
+{
+    public const int DefaultPort = 47821;
+    public float fallbackInterval = 0.2f;
+
+    private readonly string topic;
+    private readonly string fallbackPath;
+    private readonly int port;
+    private readonly bool skipExisting;
+    private readonly ConcurrentQueue<string> received = new ConcurrentQueue<string>();
+    private readonly Thread receiveThread;
+    private volatile bool running = true;
+    private volatile bool connected = false;
+    private volatile TcpClient client;
+    private bool started = false;
+    private long session = 0;
+    private long lastSeq = 0;
+    private string lastLegacyContent = "";
+    private DateTime lastWriteTime = DateTime.MinValue;
+    private float nextFileCheck = 0f;
+
+    // skipExisting：啟動前就存在的內容視為舊指令，只記下位置不執行；false 時只執行最新的一則
+    public CommandBusReader(string topic, string fallbackPath, bool skipExisting = true, int port = DefaultPort)
+    {
+        this.topic = topic;
+        this.fallbackPath = fallbackPath;
+        this.port = port;
+        this.skipExisting = skipExisting;
+
+        ReadFallback(null, !skipExisting);
+
+        receiveThread = new Thread(ReceiveLoop);
+        receiveThread.IsBackground = true;
+        receiveThread.Start();
+    }
+
+    public bool Connected
+    {
+        get { return connected; }
+    }
+
+    // 在主執行緒呼叫，依 seq 順序回傳尚未處理的訊息內容（JSON 字串）
+    public List<string> Poll()
+    {
+        List<string> payloads = new List<string>();
+        bool isConnected = connected;
+
+        // 沒有連線時定期讀備援檔；連上時匯流排會補送最近的訊息，不必再讀
+        if (!isConnected && Time.realtimeSinceStartup >= nextFileCheck)
+        {
+            nextFileCheck = Time.realtimeSinceStartup + fallbackInterval;
+            ReadFallback(payloads);
+        }
+
+        string line;
+        while (received.TryDequeue(out line))
+        {
+            try
+            {
+                BusMessage message = JsonConvert.DeserializeObject<BusMessage>(line);
+                if (message != null && message.hello)
+                    Begin(message);
+                else
+                    Accept(message, payloads);
+            }
+            catch (Exception ex)
+            {
+                Debug.LogWarning("指令匯流排訊息格式錯誤：" + ex.Message);
+            }
+        }
+        return payloads;
+    }
+
+    // 第一次連上時以 hello 當起點，之後重連的 hello 不理會，補送的訊息由 Accept 依 seq 去重。
+    // 已經從備援檔讀到同一個 session 時沿用原本的位置。
+    private void Begin(BusMessage hello)
+    {
+        if (started)
+            return;
+        started = true;
+        if (hello.session == session)
+            return;
+        session = hello.session;
+        long latest;
+        if (!skipExisting && hello.latest != null && hello.latest.TryGetValue(topic, out latest))
+            lastSeq = latest - 1;
+        else
+            lastSeq = hello.seq;
+    }
+
+    // payloads 為 null 時只更新 session 與 seq
+    private void Accept(BusMessage message, List<string> payloads)
+    {
+        if (message == null || message.topic != topic || message.payload == null)
+            return;
+        // session 較舊的是 Python 重新啟動前的訊息；較新的表示 seq 重新從頭算
+        if (message.session < session)
+            return;
+        if (message.session > session)
+        {
+            session = message.session;
+            lastSeq = 0;
+        }
+        if (message.seq <= lastSeq)
+            return;
+        lastSeq = message.seq;
+        if (payloads != null)
+            payloads.Add(message.payload.ToString(Formatting.None));
+    }
+
+    // keepLatest：只記下位置，留下最新的一則給下一次讀取執行
+    private void ReadFallback(List<string> payloads, bool keepLatest = false)
+    {
+        if (!File.Exists(fallbackPath))
+            return;
+        try
+        {
+            DateTime writeTime = File.GetLastWriteTimeUtc(fallbackPath);
+            if (writeTime == lastWriteTime)
+                return;
+
+            string content;
+            // 允許 Python 端在讀取期間 rename 覆蓋檔案
+            using (FileStream stream = new FileStream(fallbackPath, FileMode.Open, FileAccess.Read, FileShare.ReadWrite | FileShare.Delete))
+            using (StreamReader reader = new StreamReader(stream, Encoding.UTF8))
+            {
+                content = reader.ReadToEnd();
+            }
+            if (string.IsNullOrWhiteSpace(content))
+                return;
+
+            JObject root = JObject.Parse(content);
+            if (!keepLatest)
+                lastWriteTime = writeTime;
+            if (root["messages"] is JArray)
+            {
+                BusFile file = root.ToObject<BusFile>();
+                List<BusMessage> messages = file.messages.FindAll(m => m != null && m.topic == topic);
+                if (keepLatest && messages.Count > 0)
+                    messages.RemoveAt(messages.Count - 1);
+                foreach (BusMessage message in messages)
+                {
+                    Accept(message, payloads);
+                }
+            }
+            else if (keepLatest)
+            {
+                // 舊格式整份只有一則，留給下一次讀取執行
+            }
+            else if (content != lastLegacyContent)
+            {
+                lastLegacyContent = content;
+                if (payloads != null)
+                    payloads.Add(content);
+            }
+        }
+        catch (Exception)
+        {
+            // 讀到非原子寫入的半份檔案時解析會失敗，下次再讀
+        }
+    }
+
+    private void ReceiveLoop()
+    {
+        while (running)
+        {
+            try
+            {
+                using (TcpClient tcp = new TcpClient())
+                {
+                    tcp.NoDelay = true;
+                    tcp.Connect("127.0.0.1", port);
+                    client = tcp;
+                    connected = true;
+                    using (StreamReader reader = new StreamReader(tcp.GetStream(), Encoding.UTF8))
+                    {
+                        string line;
+                        while (running && (line = reader.ReadLine()) != null)
+                        {
+                            received.Enqueue(line);
+                        }
+                    }
+                }
+            }
+            catch (Exception)
+            {
+                // Python 端還沒啟動或已關閉，稍後重連
+            }
+            connected = false;
+            client = null;
+            if (running)
+                Thread.Sleep(1000);
+        }
+    }
+
+    public void Dispose()
+    {
+        running = false;
+        TcpClient tcp = client;
+        if (tcp != null)
+            tcp.Close();
+    }
+
+    [System.Serializable]
+    public class BusMessage
+    {
+        public long session;
+        public long seq;
+        public string topic;
+        public JToken payload;
+        public bool hello;
+        public Dictionary<string, long> latest;
+    }
+
+    [System.Serializable]
+    public class BusFile
+    {
+        public long session;
+        public long seq;
+        public List<BusMessage> messages;
+    }
+}
@@ -6,20 +6,25 @@ using System.Text.RegularExpressions;
 
 public class FurnitureController : MonoBehaviour
 {
-    private string lastJson = "";
-    private string jsonPath;
+    private CommandBusReader busReader;
     private float defaultOffset = 1f;
     private GameObject floorCenter;
 
     void Start()
     {
         CreateInitialFloor();
-        jsonPath = Path.Combine(Application.streamingAssetsPath, "furniture_command.json");
+        // 即時接收 command_bus 的指令，Python 端沒開時改讀 furniture_command.json（啟動前既有的指令和原本一樣只執行最新的一則）
+        busReader = new CommandBusReader("command", Path.Combine(Application.streamingAssetsPath, "furniture_command.json"), false);
         floorCenter = GameObject.Find("地板");
         PositionCameraAboveFloor();
         StartCoroutine(CheckJsonLoop());
     }
 
+    void OnDestroy()
+    {
+        busReader.Dispose();
+    }
+
     void CreateInitialFloor()
     {
         GameObject prefab = Resources.Load<GameObject>("地板");
@@ -58,24 +63,20 @@ public class FurnitureController : MonoBehaviour
     {
         while (true)
         {
-            if (File.Exists(jsonPath))
+            // 五子棋的指令也走同一個主題，HandleCommand 只處理 type 為 furniture_control 的指令
+            foreach (string content in busReader.Poll())
             {
-                string content = File.ReadAllText(jsonPath);
-                if (content != lastJson && !string.IsNullOrWhiteSpace(content))
+                try
+                {
+                    FurnitureCommand cmd = JsonConvert.DeserializeObject<FurnitureCommand>(content);
+                    HandleCommand(cmd);
+                }
+                catch (System.Exception e)
                 {
-                    lastJson = content;
-                    try
-                    {
-                        FurnitureCommand cmd = JsonConvert.DeserializeObject<FurnitureCommand>(content);
-                        HandleCommand(cmd);
-                    }
-                    catch (System.Exception e)
-                    {
-                        Debug.LogError("JSON 解析錯誤: " + e.Message);
-                    }
+                    Debug.LogError("JSON 解析錯誤: " + e.Message);
                 }
             }
-            yield return new WaitForSeconds(1f);
+            yield return null;
         }
     }
 
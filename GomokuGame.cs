@@ -15,9 +15,9 @@ public class GomokuGame : MonoBehaviour
     public TextMeshProUGUI moveHistoryText;
     // 顯示「目前輪到誰」或「誰勝利」的 UI 元件
     private TextMeshProUGUI turnStatusText;
-    private string lastJsonContent = "";
     private string currentPlayer = "黑子";
     private string jsonPath;
+    private CommandBusReader busReader;
     private Dictionary<string, string> boardState = new Dictionary<string, string>();
     private List<GameObject> placedStones = new List<GameObject>();
     private List<string> moveHistory = new List<string>();
@@ -49,19 +49,20 @@ public class GomokuGame : MonoBehaviour
         // 設定攝影機
         SetCameraAboveBoard();
 
-        // 啟動 JSON 監聽
+        // 啟動指令監聽：即時接收 command_bus 的訊息，Python 端沒開時改讀 step.json
         jsonPath = Path.Combine(Application.streamingAssetsPath, "step.json");
         Debug.Log("JSON 檔案路徑: " + jsonPath);
 
-        // ⛔ 避免讀到上次的內容（初始化 lastJsonContent）
-        if (File.Exists(jsonPath))
-        {
-            lastJsonContent = File.ReadAllText(jsonPath);
-            Debug.Log("已略過初始 JSON 內容。等待下一次變化才執行。");
-        }
+        // ⛔ 避免讀到上次的內容：CommandBusReader 會略過啟動前已存在的訊息（備援檔與 socket 補送的都一樣）
+        busReader = new CommandBusReader("command", jsonPath);
         StartCoroutine(CheckJsonLoop());
     }
 
+    void OnDestroy()
+    {
+        busReader.Dispose();
+    }
+
     void CreateHistoryCanvas()
     {
         GameObject canvasObj = new GameObject("WorldCanvas", typeof(Canvas), typeof(CanvasScaler), typeof(GraphicRaycaster));
@@ -176,48 +177,47 @@ public class GomokuGame : MonoBehaviour
         {
             if (gameEnded) yield break;
 
-            if (File.Exists(jsonPath))
+            // 玩家與 AI 的落子是兩則訊息，同一個影格收到時依序處理，不會互相覆蓋
+            foreach (string jsonContent in busReader.Poll())
             {
-                string jsonContent = File.ReadAllText(jsonPath);
-                if (jsonContent != lastJsonContent && !string.IsNullOrWhiteSpace(jsonContent))
+                // 已分出勝負後，剩下的訊息不再處理
+                if (gameEnded) break;
+
+                try
                 {
-                    lastJsonContent = jsonContent;
-                    try
+                    StepData stepData = JsonConvert.DeserializeObject<StepData>(jsonContent);
+                    if (stepData != null && !string.IsNullOrEmpty(stepData.玩家棋子顏色) && !string.IsNullOrEmpty(stepData.下的格子))
+                    {
+                        HandleMove(stepData);
+                    }
+                    else
                     {
-                        StepData stepData = JsonConvert.DeserializeObject<StepData>(jsonContent);
-                        if (stepData != null && !string.IsNullOrEmpty(stepData.玩家棋子顏色) && !string.IsNullOrEmpty(stepData.下的格子))
+                        CommandData commandData = JsonConvert.DeserializeObject<CommandData>(jsonContent);
+                        if (commandData != null && !string.IsNullOrEmpty(commandData.遊戲指令))
                         {
-                            HandleMove(stepData);
+                            HandleCommand(commandData);
                         }
                         else
                         {
-                            CommandData commandData = JsonConvert.DeserializeObject<CommandData>(jsonContent);
-                            if (commandData != null && !string.IsNullOrEmpty(commandData.遊戲指令))
+                            Debug.Log("錯誤：JSON 格式無法識別，請確認是下棋步驟或有效指令。");
+                            if (turnStatusText != null)
                             {
-                                HandleCommand(commandData);
-                            }
-                            else
-                            {
-                                Debug.Log("錯誤：JSON 格式無法識別，請確認是下棋步驟或有效指令。");
-                                if (turnStatusText != null)
-                                {
-                                    turnStatusText.text = "錯誤：JSON 格式無法識別，請確認是下棋步驟或有效指令。";
-                                }
+                                turnStatusText.text = "錯誤：JSON 格式無法識別，請確認是下棋步驟或有效指令。";
                             }
                         }
                     }
-                    catch (System.Exception ex)
+                }
+                catch (System.Exception ex)
+                {
+                    Debug.Log("JSON 格式錯誤，請重新確認。錯誤訊息：" + ex.Message);
+                    if (turnStatusText != null)
                     {
-                        Debug.Log("JSON 格式錯誤，請重新確認。錯誤訊息：" + ex.Message);
-                        if (turnStatusText != null)
-                        {
-                            turnStatusText.text = "JSON 格式錯誤，請重新確認。錯誤訊息：" + ex.Message;
-                        }
+                        turnStatusText.text = "JSON 格式錯誤，請重新確認。錯誤訊息：" + ex.Message;
                     }
                 }
             }
 
-            yield return new WaitForSeconds(1f);
+            yield return null;
         }
     }
 
@@ -6,22 +6,20 @@ using Newtonsoft.Json;
 
 public class MainMenuController : MonoBehaviour
 {
-    private string lastJsonContent = "";
-    private string jsonPath;
+    private CommandBusReader busReader;
 
     void Start()
     {
-        jsonPath = Path.Combine(Application.streamingAssetsPath, "change.json");
-
-        // ⚠️ 讀取初始內容但不執行切換
-        if (File.Exists(jsonPath))
-        {
-            lastJsonContent = File.ReadAllText(jsonPath);
-        }
-
+        // ⚠️ 啟動前已存在的內容不執行切換（CommandBusReader 只回傳之後的新訊息）
+        busReader = new CommandBusReader("change", Path.Combine(Application.streamingAssetsPath, "change.json"));
         StartCoroutine(CheckJsonLoop());
     }
 
+    void OnDestroy()
+    {
+        busReader.Dispose();
+    }
+
     public void StartGomoku()
     {
         SceneManager.LoadScene("GomokuScene");
@@ -44,39 +42,32 @@ public class MainMenuController : MonoBehaviour
     {
         while (true)
         {
-            if (File.Exists(jsonPath))
+            // ⚠️ 僅在收到新訊息時執行切換
+            foreach (string jsonContent in busReader.Poll())
             {
-                string jsonContent = File.ReadAllText(jsonPath);
-    
-                // ⚠️ 僅在變更時執行切換
-                if (jsonContent != lastJsonContent && !string.IsNullOrWhiteSpace(jsonContent))
+                try
                 {
-                    lastJsonContent = jsonContent;
+                    SelectionData data = JsonConvert.DeserializeObject<SelectionData>(jsonContent);
 
-                    try
+                    if (data != null && !string.IsNullOrEmpty(data.選擇的項目))
                     {
-                        SelectionData data = JsonConvert.DeserializeObject<SelectionData>(jsonContent);
-    
-                        if (data != null && !string.IsNullOrEmpty(data.選擇的項目))
-                        {
-                            if (data.選擇的項目 == "五子棋")
-                                StartGomoku();
-                            else if (data.選擇的項目 == "家具控制")
-                                StartFurnitureControl();
-                        }
-                        else
-                        {
-                            Debug.LogWarning("change.json 格式錯誤或資料為空。");
-                        }
+                        if (data.選擇的項目 == "五子棋")
+                            StartGomoku();
+                        else if (data.選擇的項目 == "家具控制")
+                            StartFurnitureControl();
                     }
-                    catch (System.Exception ex)
+                    else
                     {
-                        Debug.LogError("解析 change.json 發生錯誤：" + ex.Message);
+                        Debug.LogWarning("change.json 格式錯誤或資料為空。");
                     }
                 }
+                catch (System.Exception ex)
+                {
+                    Debug.LogError("解析 change.json 發生錯誤：" + ex.Message);
+                }
             }
 
-            yield return new WaitForSeconds(1f);
+            yield return null;
         }
     }
 
@@ -6,58 +6,50 @@ using Newtonsoft.Json;
 
 public class SceneSwitchWatcher : MonoBehaviour
 {
-    private string lastJsonContent = "";
-    private string jsonPath;
+    private CommandBusReader busReader;
 
     void Awake()
     {
         DontDestroyOnLoad(this.gameObject); // 場景切換時保留此物件
-        jsonPath = Path.Combine(Application.streamingAssetsPath, "change.json");
-
-        if (File.Exists(jsonPath))
-        {
-            lastJsonContent = File.ReadAllText(jsonPath);
-        }
-
+        // 即時接收 command_bus 的 "change" 訊息，Python 端沒開時改讀 change.json
+        busReader = new CommandBusReader("change", Path.Combine(Application.streamingAssetsPath, "change.json"));
         StartCoroutine(CheckJsonLoop());
     }
 
+    void OnDestroy()
+    {
+        busReader.Dispose();
+    }
+
     IEnumerator CheckJsonLoop()
     {
         while (true)
         {
-            if (File.Exists(jsonPath))
+            foreach (string jsonContent in busReader.Poll())
             {
-                string jsonContent = File.ReadAllText(jsonPath);
-
-                if (jsonContent != lastJsonContent && !string.IsNullOrWhiteSpace(jsonContent))
+                try
                 {
-                    lastJsonContent = jsonContent;
+                    SelectionData data = JsonConvert.DeserializeObject<SelectionData>(jsonContent);
 
-                    try
+                    if (data != null && !string.IsNullOrEmpty(data.選擇的項目))
                     {
-                        SelectionData data = JsonConvert.DeserializeObject<SelectionData>(jsonContent);
-
-                        if (data != null && !string.IsNullOrEmpty(data.選擇的項目))
+                        if (data.選擇的項目 == "五子棋" && SceneManager.GetActiveScene().name != "GomokuScene")
                         {
-                            if (data.選擇的項目 == "五子棋" && SceneManager.GetActiveScene().name != "GomokuScene")
-                            {
-                                SceneManager.LoadScene("GomokuScene");
-                            }
-                            else if (data.選擇的項目 == "家具控制" && SceneManager.GetActiveScene().name != "FurnitureScene")
-                            {
-                                SceneManager.LoadScene("FurnitureScene");
-                            }
+                            SceneManager.LoadScene("GomokuScene");
+                        }
+                        else if (data.選擇的項目 == "家具控制" && SceneManager.GetActiveScene().name != "FurnitureScene")
+                        {
+                            SceneManager.LoadScene("FurnitureScene");
                         }
                     }
-                    catch (System.Exception ex)
-                    {
-                        Debug.LogError("解析 change.json 發生錯誤：" + ex.Message);
-                    }
+                }
+                catch (System.Exception ex)
+                {
+                    Debug.LogError("解析 change.json 發生錯誤：" + ex.Message);
                 }
             }
 
-            yield return new WaitForSeconds(1f);
+            yield return null;
         }
     }
 
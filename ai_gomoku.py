@@ -1,5 +1,13 @@
+import heapq
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
 import numpy as np
 
+from gomoku_book import KIND_BOOK, KIND_SOLVED, OpeningBook
+
 BOARD_SIZE = 15
 EMPTY = 0
 BLACK = 1
@@ -29,136 +37,1074 @@ def get_lines(board):
         lines.append(np.diagonal(flipped, offset=offset))
     return lines
 
-def evaluate_line(line, color):
+def evaluate_line(line, color, patterns=None):
     opponent = BLACK if color == WHITE else WHITE
     line_str = ''.join(str(1 if x == color else (2 if x == opponent else 0)) for x in line)
     score = 0
-    for pattern, value in pattern_scores.items():
+    for pattern, value in (patterns or pattern_scores).items():
         score += line_str.count(pattern) * value
     return score
 
-def evaluate_board(state, color):
-    board = np.full((BOARD_SIZE, BOARD_SIZE), EMPTY)
-    for (i, j), c in state.items():
-        board[i][j] = c
-    score_self = sum(evaluate_line(line, color) for line in get_lines(board))
-    score_oppo = sum(evaluate_line(line, BLACK if color == WHITE else WHITE) for line in get_lines(board))
-    return score_self - score_oppo
+def _build_line_slices():
+    # get_lines 產生的每條線在一維盤面上都是等差數列，可直接轉成 slice，方向與原本一致
+    index_grid = np.arange(BOARD_SIZE * BOARD_SIZE).reshape(BOARD_SIZE, BOARD_SIZE)
+    slices = []
+    for line in get_lines(index_grid):
+        start, step = int(line[0]), int(line[1] - line[0])
+        slices.append(slice(start, int(line[-1]) + 1, step))
+    return slices
 
-def check_win_fast(state, x, y):
-    color = state.get((x, y))
-    for dx, dy in DIRECTIONS:
-        count = 1
-        for dir in [1, -1]:
-            nx, ny = x, y
-            while True:
-                nx += dx * dir
-                ny += dy * dir
-                if state.get((nx, ny)) == color:
-                    count += 1
-                else:
-                    break
-        if count >= 5:
+LINE_SLICES = _build_line_slices()
+# 每個格子所在的線（橫、直、兩條斜線；長度不足 5 的斜線不計）
+CELL_LINES = [[] for _ in range(BOARD_SIZE * BOARD_SIZE)]
+for _line_id, _sl in enumerate(LINE_SLICES):
+    for _idx in range(_sl.start, _sl.stop, _sl.step):
+        CELL_LINES[_idx].append(_line_id)
+
+# 一維盤面索引排成 (72, 15) 的線矩陣，不足 15 格的斜線以 0 補齊，由 LINE_LENGTHS 遮掉
+LINE_LENGTHS = np.array([len(range(sl.start, sl.stop, sl.step)) for sl in LINE_SLICES])
+LINE_INDEX = np.zeros((len(LINE_SLICES), BOARD_SIZE), dtype=np.intp)
+for _line_id, _sl in enumerate(LINE_SLICES):
+    _idx = np.arange(_sl.start, _sl.stop, _sl.step)
+    LINE_INDEX[_line_id, :len(_idx)] = _idx
+
+# 以某方為 1、對手為 2 的相對編碼（NumPy 查表用）
+RELATIVE_CODES = {
+    BLACK: np.array([0, 1, 2], dtype=np.int32),
+    WHITE: np.array([0, 2, 1], dtype=np.int32),
+}
+
+# 把 pattern_scores 編譯成以三進位窗口編碼為索引的查表：
+# tables[w][code] 是長度 w 的窗口對應的 pattern 編號（-1 表示不符合任何 pattern）。
+# str.count 只計算不重疊的出現次數，會自我重疊的 pattern（如 "11111"）需要逐格貪婪計數。
+class PatternTable:
+    def __init__(self, patterns):
+        self.patterns = dict(patterns)
+        self.values = np.array(list(self.patterns.values()), dtype=np.int64)
+        self.lengths = sorted({len(p) for p in self.patterns})
+        self.tables = {w: np.full(3 ** w, -1, dtype=np.int16) for w in self.lengths}
+        self.by_length = {w: [] for w in self.lengths}
+        for pattern_id, pattern in enumerate(self.patterns):
+            w = len(pattern)
+            self.tables[w][int(pattern, 3)] = pattern_id
+            overlapping = any(pattern[k:] == pattern[:w - k] for k in range(1, w))
+            self.by_length[w].append((pattern_id, overlapping))
+
+    def score_lines(self, lines, lengths):
+        # lines: (..., 線數, 15) 的相對編碼；回傳 (..., 線數) 的每線分數
+        code_type = np.int16 if 3 ** self.lengths[-1] <= np.iinfo(np.int16).max else np.int32
+        # 格子軸移到最前面，滑動窗口變成連續的切片，向量運算快很多
+        cells = np.ascontiguousarray(np.moveaxis(np.asarray(lines, dtype=code_type), -1, 0))
+        size = cells.shape[0]
+        total = np.zeros(cells.shape[1:], dtype=np.int64)
+        codes, width = None, 0
+        for w in self.lengths:
+            if w > size:
+                continue
+            # 逐格滾動算出每個滑動窗口的三進位編碼（等同窗口與 3 的冪次做內積）
+            positions = size - w + 1
+            codes = np.zeros((positions,) + cells.shape[1:], dtype=code_type) if codes is None else codes[:positions]
+            for k in range(width, w):
+                codes = codes * 3 + cells[k:k + positions]
+            width = w
+            ids = self.tables[w][codes]
+            invalid = (np.arange(positions)[:, None] + w > lengths[None, :]).reshape(
+                (positions,) + (1,) * (cells.ndim - 2) + (len(lengths),))
+            ids[np.broadcast_to(invalid, ids.shape)] = -1
+            for pattern_id, overlapping in self.by_length[w]:
+                matches = ids == pattern_id
+                counts = matches.sum(axis=0)
+                if overlapping:
+                    # 同一條線出現兩次以上才可能重疊，只對這些線逐格貪婪計數
+                    multi = np.nonzero(counts >= 2)
+                    if len(multi[0]):
+                        subset = matches[(slice(None),) + multi]
+                        greedy = np.zeros(subset.shape[1], dtype=np.int64)
+                        next_free = np.zeros(subset.shape[1], dtype=np.int64)
+                        for pos in range(positions):
+                            take = subset[pos] & (pos >= next_free)
+                            greedy += take
+                            next_free = np.where(take, pos + w, next_free)
+                        counts[multi] = greedy
+                total += self.values[pattern_id] * counts
+        return total
+
+    def score_boards(self, cells, color):
+        # cells: (..., 225) 的盤面（可一次評估多個盤面），回傳 color 一方的 pattern 總分
+        lines = RELATIVE_CODES[color][np.asarray(cells)[..., LINE_INDEX]]
+        return self.score_lines(lines, LINE_LENGTHS).sum(axis=-1)
+
+PATTERN_TABLE = PatternTable(pattern_scores)
+
+def evaluate_boards(cells, color, table=PATTERN_TABLE):
+    opponent = BLACK if color == WHITE else WHITE
+    return table.score_boards(cells, color) - table.score_boards(cells, opponent)
+
+def verify_pattern_table(samples=200, seed=0, table=PATTERN_TABLE):
+    # 隨機盤面上比對查表評分與原本的字串評分，不一致時丟出 AssertionError
+    rng = np.random.default_rng(seed)
+    for _ in range(samples):
+        fill = rng.random()
+        grid = np.where(rng.random((BOARD_SIZE, BOARD_SIZE)) < fill,
+                        rng.integers(BLACK, WHITE + 1, (BOARD_SIZE, BOARD_SIZE)), EMPTY)
+        for color in (BLACK, WHITE):
+            expected = sum(evaluate_line(line, color, table.patterns) for line in get_lines(grid))
+            actual = int(table.score_boards(grid.reshape(-1), color))
+            assert actual == expected, (grid.tolist(), color, actual, expected)
+    return True
+
+# 把盤面上的 0/1/2 轉成以某方為 "1" 的字元，效果同 evaluate_line 裡的字串轉換
+_RELATIVE_TABLES = {
+    BLACK: bytes([ord("0"), ord("1"), ord("2")]) + bytes(range(3, 256)),
+    WHITE: bytes([ord("0"), ord("2"), ord("1")]) + bytes(range(3, 256)),
+}
+
+# 每色一個 Python int 當 bitboard，每列 16 位元（多一欄空白當邊界），位移時不會跨列誤判
+BIT_ROW = BOARD_SIZE + 1
+BIT_SHIFTS = [BIT_ROW, 1, BIT_ROW + 1, BIT_ROW - 1]  # 對應 DIRECTIONS
+CELL_BITS = [1 << (x * BIT_ROW + y) for x in range(BOARD_SIZE) for y in range(BOARD_SIZE)]
+
+def _build_five_start_masks():
+    # FIVE_START_MASKS[idx][d]：方向 d 上所有「包含 idx 的五連」起點位元
+    masks = []
+    for x in range(BOARD_SIZE):
+        for y in range(BOARD_SIZE):
+            per_dir = []
+            for dx, dy in DIRECTIONS:
+                mask = 0
+                for k in range(5):
+                    sx, sy = x - dx * k, y - dy * k
+                    ex, ey = sx + dx * 4, sy + dy * 4
+                    if 0 <= sx < BOARD_SIZE and 0 <= sy < BOARD_SIZE and 0 <= ex < BOARD_SIZE and 0 <= ey < BOARD_SIZE:
+                        mask |= 1 << (sx * BIT_ROW + sy)
+                per_dir.append(mask)
+            masks.append(per_dir)
+    return masks
+
+FIVE_START_MASKS = _build_five_start_masks()
+
+def has_five_through(bits, idx):
+    for d, mask in zip(BIT_SHIFTS, FIVE_START_MASKS[idx]):
+        m = bits & (bits >> d)
+        m &= m >> (2 * d)
+        if m & (bits >> (4 * d)) & mask:
             return True
     return False
 
-def minimax(state, depth, alpha, beta, is_ai_turn):
-    for (x, y), c in state.items():
-        if check_win_fast(state, x, y):
-            return (1000000 if c == WHITE else -1000000), None
+BOARD_MASK = sum(CELL_BITS)
+
+# 落下一子就和 bits 裡的棋子連成五的所有位置（含已有棋子與盤外的位元，呼叫端自行遮掉）：
+# 每個方向依空位在五格窗口中的位置分成 _XXXX、X_XXX、XX_XX、XXX_X、XXXX_ 五種
+def five_completion_bits(bits):
+    result = 0
+    for d in BIT_SHIFTS:
+        two = bits & (bits >> d)
+        three = two & (bits >> (2 * d))
+        four = three & (bits >> (3 * d))
+        result |= ((four >> d) | ((bits & (three >> (2 * d))) << d) | ((two & (two >> (3 * d))) << (2 * d))
+                   | ((three & (bits >> (4 * d))) << (3 * d)) | (four << (4 * d)))
+    return result
+
+# 候選點鄰域：5x5 範圍內的格子，相鄰一圈權重 2、外圈權重 1
+def _build_neighbors():
+    neighbors = []
+    for x in range(BOARD_SIZE):
+        for y in range(BOARD_SIZE):
+            cells = []
+            for dx in range(-2, 3):
+                for dy in range(-2, 3):
+                    nx, ny = x + dx, y + dy
+                    if (dx or dy) and 0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE:
+                        cells.append((nx * BOARD_SIZE + ny, 2 if max(abs(dx), abs(dy)) == 1 else 1))
+            neighbors.append(cells)
+    return neighbors
+
+NEIGHBORS = _build_neighbors()
+
+# Zobrist 亂數表（固定種子，多個行程算出的 hash 一致）；ZOBRIST[color][idx]
+_zobrist_rng = np.random.default_rng(20240501)
+ZOBRIST = [[0] * (BOARD_SIZE * BOARD_SIZE)] + [
+    _zobrist_rng.integers(1, 2 ** 63, BOARD_SIZE * BOARD_SIZE, dtype=np.int64).tolist()
+    for _ in (BLACK, WHITE)
+]
+ZOBRIST_AI_TURN = int(_zobrist_rng.integers(1, 2 ** 63, dtype=np.int64))
+
+# 棋盤的 8 種對稱（旋轉、鏡射）：SYMMETRIES[s][idx] 是 idx 轉換後的位置
+def _build_symmetries():
+    n = BOARD_SIZE - 1
+    transforms = [
+        lambda x, y: (x, y), lambda x, y: (y, x), lambda x, y: (n - x, y), lambda x, y: (x, n - y),
+        lambda x, y: (n - x, n - y), lambda x, y: (y, n - x), lambda x, y: (n - y, x), lambda x, y: (n - y, n - x),
+    ]
+    symmetries = []
+    for transform in transforms:
+        table = [0] * (BOARD_SIZE * BOARD_SIZE)
+        for x in range(BOARD_SIZE):
+            for y in range(BOARD_SIZE):
+                tx, ty = transform(x, y)
+                table[x * BOARD_SIZE + y] = tx * BOARD_SIZE + ty
+        symmetries.append(table)
+    return symmetries
+
+SYMMETRIES = _build_symmetries()
+INVERSE_SYMMETRIES = []
+for _table in SYMMETRIES:
+    _inverse = [0] * len(_table)
+    for _idx, _target in enumerate(_table):
+        _inverse[_target] = _idx
+    INVERSE_SYMMETRIES.append(_inverse)
+
+# 8 種對稱中最小的 Zobrist 值當作標準 key，回傳 (key, 使用的對稱編號)
+def canonical_key(board):
+    keys = [0] * len(SYMMETRIES)
+    for x, y in board.stones:
+        idx = x * BOARD_SIZE + y
+        table = ZOBRIST[board.cells[idx]]
+        for s, symmetry in enumerate(SYMMETRIES):
+            keys[s] ^= table[symmetry[idx]]
+    best = min(range(len(keys)), key=keys.__getitem__)
+    return keys[best], best
+
+# 15x15 棋盤：一維 bytearray 存放棋子，落子/悔棋皆為 O(1) 的原地修改。
+# 保留 dict 風格的 get/items/clear，讓 GUI 仍可用 ai.state 讀取盤面。
+# 每條線、每種顏色的分數都有快取，落子或悔棋後只重算通過該格的四條線。
+class Board:
+    def __init__(self, patterns=None):
+        self.size = BOARD_SIZE
+        self.cells = bytearray(BOARD_SIZE * BOARD_SIZE)
+        # 與 cells 共用記憶體的 NumPy 視圖，評估時不需重建陣列
+        self.grid = np.frombuffer(self.cells, dtype=np.uint8).reshape(BOARD_SIZE, BOARD_SIZE)
+        self.stones = []
+        self.bits = [0, 0, 0]
+        self.hash = 0
+        # 候選點前緣：near[idx] 是周圍棋子的加權數，frontier 是 near > 0 的空格
+        self.near = [0] * (BOARD_SIZE * BOARD_SIZE)
+        self.frontier = set()
+        self.pattern_table = PatternTable(patterns) if patterns else PATTERN_TABLE
+        self.patterns = [(p.encode(), v) for p, v in self.pattern_table.patterns.items()]
+        self.line_scores = {BLACK: [0] * len(LINE_SLICES), WHITE: [0] * len(LINE_SLICES)}
+        self.scores = {BLACK: 0, WHITE: 0}
+        self.rescore_all()
+
+    def score_line(self, line_id, color):
+        return self._score_bytes(self.cells[LINE_SLICES[line_id]], color)
+
+    def rescore_all(self):
+        # 整盤重算時用查表一次評估所有線；之後的增量更新只重算四條線
+        table = self.pattern_table
+        cells = np.frombuffer(self.cells, dtype=np.uint8)
+        for color in (BLACK, WHITE):
+            lines = RELATIVE_CODES[color][cells[LINE_INDEX]]
+            per_line = table.score_lines(lines, LINE_LENGTHS)
+            self.line_scores[color] = [int(v) for v in per_line]
+            self.scores[color] = sum(self.line_scores[color])
+
+    def _rescore_cell(self, idx):
+        for color in (BLACK, WHITE):
+            scores = self.line_scores[color]
+            total = self.scores[color]
+            for line_id in CELL_LINES[idx]:
+                new = self.score_line(line_id, color)
+                total += new - scores[line_id]
+                scores[line_id] = new
+            self.scores[color] = total
+
+    def _score_bytes(self, line, color):
+        line_str = line.translate(_RELATIVE_TABLES[color])
+        return sum(line_str.count(p) * v for p, v in self.patterns)
+
+    # 走法排序用的靜態威脅分數：在此格落子對自己棋型的增益，加上對手落在此格的增益（防守價值）
+    def threat_score(self, x, y, color):
+        idx = x * self.size + y
+        opponent = BLACK if color == WHITE else WHITE
+        total = 0
+        for line_id in CELL_LINES[idx]:
+            sl = LINE_SLICES[line_id]
+            line = self.cells[sl]
+            pos = (idx - sl.start) // sl.step
+            line[pos] = color
+            total += self._score_bytes(line, color) - self.line_scores[color][line_id]
+            line[pos] = opponent
+            total += self._score_bytes(line, opponent) - self.line_scores[opponent][line_id]
+        return total
+
+    def evaluate(self, color):
+        return self.scores[color] - self.scores[BLACK if color == WHITE else WHITE]
+
+    def make_move(self, x, y, color):
+        idx = x * self.size + y
+        self.cells[idx] = color
+        self.stones.append((x, y))
+        self.bits[color] ^= CELL_BITS[idx]
+        self.hash ^= ZOBRIST[color][idx]
+        near, frontier, cells = self.near, self.frontier, self.cells
+        frontier.discard(idx)
+        for n, weight in NEIGHBORS[idx]:
+            if not near[n] and not cells[n]:
+                frontier.add(n)
+            near[n] += weight
+        self._rescore_cell(idx)
+
+    def unmake_move(self, x, y):
+        idx = x * self.size + y
+        color = self.cells[idx]
+        self.cells[idx] = EMPTY
+        self.bits[color] ^= CELL_BITS[idx]
+        self.hash ^= ZOBRIST[color][idx]
+        near, frontier = self.near, self.frontier
+        for n, weight in NEIGHBORS[idx]:
+            near[n] -= weight
+            if not near[n]:
+                frontier.discard(n)
+        if near[idx]:
+            frontier.add(idx)
+        if self.stones and self.stones[-1] == (x, y):
+            self.stones.pop()
+        else:
+            self.stones.remove((x, y))
+        self._rescore_cell(idx)
+        return color
+
+    def color_at(self, x, y):
+        if 0 <= x < self.size and 0 <= y < self.size:
+            return self.cells[x * self.size + y]
+        return EMPTY
+
+    def get(self, pos, default=None):
+        return self.color_at(*pos) or default
+
+    def items(self):
+        return [((x, y), self.cells[x * self.size + y]) for x, y in self.stones]
+
+    def clear(self):
+        self.cells[:] = bytes(len(self.cells))
+        self.stones.clear()
+        self.bits = [0, 0, 0]
+        self.hash = 0
+        self.near = [0] * (BOARD_SIZE * BOARD_SIZE)
+        self.frontier.clear()
+        self.rescore_all()
+
+    def __contains__(self, pos):
+        return self.color_at(*pos) != EMPTY
+
+    def __len__(self):
+        return len(self.stones)
+
+    def __iter__(self):
+        return iter(list(self.stones))
+
+def evaluate_board(board, color):
+    return board.evaluate(color)
+
+# 只檢查通過 (x, y) 的四條線是否成五（bitboard 位移）
+def check_win_fast(board, x, y):
+    color = board.color_at(x, y)
+    if color == EMPTY:
+        return False
+    return has_five_through(board.bits[color], x * BOARD_SIZE + y)
+
+TT_EXACT = 0
+TT_LOWER = 1
+TT_UPPER = 2
+TT_ENTRY = np.dtype([("key", np.uint64), ("score", np.float64), ("move", np.int16),
+                     ("depth", np.int8), ("flag", np.int8)])
+
+# 固定大小的置換表：每個 bucket 兩格，第 0 格保留搜尋深度較深的結果（depth-preferred），
+# 第 1 格永遠覆蓋（always-replace）。容量由 max_mb 決定，取不超過上限的 2 的次方個 bucket。
+# shared=True 時放在具名共享記憶體，平行搜尋的 worker 以 attach() 共用同一張表（不加鎖，盡力而為）。
+class TranspositionTable:
+    def __init__(self, max_mb=16, shared=False):
+        buckets = max(1, int(max_mb * 1024 * 1024) // (2 * TT_ENTRY.itemsize))
+        self.buckets = 1 << (buckets.bit_length() - 1)
+        self.mask = self.buckets - 1
+        self.shm = None
+        if shared:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.buckets * 2 * TT_ENTRY.itemsize)
+            self.entries = np.ndarray(self.buckets * 2, dtype=TT_ENTRY, buffer=self.shm.buf)
+            self.entries[:] = 0
+        else:
+            self.entries = np.zeros(self.buckets * 2, dtype=TT_ENTRY)
+        self.entries["depth"] = -1
+
+    @classmethod
+    def attach(cls, name, buckets):
+        tt = cls.__new__(cls)
+        tt.buckets = buckets
+        tt.mask = buckets - 1
+        tt.shm = shared_memory.SharedMemory(name=name)
+        tt.entries = np.ndarray(buckets * 2, dtype=TT_ENTRY, buffer=tt.shm.buf)
+        return tt
+
+    def close(self, unlink=True):
+        if self.shm is not None:
+            self.entries = None
+            self.shm.close()
+            if unlink:
+                self.shm.unlink()
+            self.shm = None
+
+    def probe(self, key):
+        slot = (key & self.mask) * 2
+        for i in (slot, slot + 1):
+            entry = self.entries[i]
+            if entry["key"] == key and entry["depth"] >= 0:
+                move = int(entry["move"])
+                move = divmod(move, BOARD_SIZE) if move >= 0 else None
+                return int(entry["depth"]), int(entry["flag"]), float(entry["score"]), move
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        slot = (key & self.mask) * 2
+        deep = self.entries[slot]
+        if deep["key"] != key and depth < deep["depth"]:
+            slot += 1
+        self.entries[slot] = (key, score, move[0] * BOARD_SIZE + move[1] if move else -1, depth, flag)
+
+    def clear(self):
+        self.entries[:] = 0
+        self.entries["depth"] = -1
+
+WIN_SCORE = 1000000
+
+# 一次搜尋的狀態：置換表、殺手著法、歷史啟發分數與時間限制。
+# 超過 deadline 或 stop_event 被設定時標記 stopped，呼叫端應丟棄這一層未完成的結果。
+# root_moves / shared_alpha 供平行根節點分割使用：只搜尋分配到的根著法，
+# 並透過共享陣列（依深度索引）交換目前最好的根分數來收緊 alpha。
+class Search:
+    def __init__(self, tt=None, deadline=None, root_moves=None, shared_alpha=None, max_candidates=None,
+                 stop_event=None):
+        self.tt = tt
+        self.deadline = deadline
+        self.stop_event = stop_event
+        self.max_candidates = max_candidates
+        self.root_moves = root_moves
+        self.shared_alpha = shared_alpha
+        self.stopped = False
+        self.nodes = 0
+        self.killers = {}
+        self.history = [0] * (BOARD_SIZE * BOARD_SIZE)
+        self.completed = []
+
+    def order_moves(self, board, moves, color, ply, tt_move=None):
+        killers = self.killers.get(ply, ())
+        history = self.history
+
+        def key(move):
+            if move == tt_move:
+                return (3, 0, 0)
+            if move in killers:
+                return (2, 0, 0)
+            return (1, board.threat_score(move[0], move[1], color), history[move[0] * BOARD_SIZE + move[1]])
+
+        return sorted(moves, key=key, reverse=True)
+
+    def _record_cutoff(self, move, depth, ply):
+        self.history[move[0] * BOARD_SIZE + move[1]] += depth * depth
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+
+    def minimax(self, board, depth, alpha, beta, is_ai_turn, ply=0, last_move=None):
+        self.nodes += 1
+        if self.nodes & 31 == 0:
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                self.stopped = True
+            if self.stop_event is not None and self.stop_event.is_set():
+                self.stopped = True
+        if self.stopped:
+            return 0, None
 
-    if depth == 0:
-        return evaluate_board(state, WHITE), None
+        # 只有上一手可能造成五連，不必檢查盤上每顆棋子
+        if last_move is None and board.stones:
+            last_move = board.stones[-1]
+        if last_move is not None and check_win_fast(board, *last_move):
+            return (WIN_SCORE if board.color_at(*last_move) == WHITE else -WIN_SCORE), None
 
-    best_move = None
-    moves = get_neighboring_moves(state)
+        if depth == 0:
+            return evaluate_board(board, WHITE), None
 
-    if is_ai_turn:
-        max_score = float('-inf')
+        split_root = ply == 0 and self.root_moves is not None
+        tt = None if split_root else self.tt
+        key = board.hash ^ ZOBRIST_AI_TURN if is_ai_turn else board.hash
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None
+        if tt is not None:
+            entry = tt.probe(key)
+            if entry is not None and entry[3] is not None:
+                tt_depth, flag, score, tt_move = entry
+                if tt_depth >= depth:
+                    if flag == TT_EXACT:
+                        return score, tt_move
+                    if flag == TT_LOWER:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if beta <= alpha:
+                        return score, tt_move
+
+        color = WHITE if is_ai_turn else BLACK
+        moves = self.root_moves if split_root else get_neighboring_moves(board, self.max_candidates)
+        moves = self.order_moves(board, moves, color, ply, tt_move)
+        shared_alpha = self.shared_alpha if split_root and is_ai_turn else None
+        best_move = None
+        best_score = float('-inf') if is_ai_turn else float('inf')
         for x, y in moves:
-            state_copy = state.copy()
-            state_copy[(x, y)] = WHITE
-            score, _ = minimax(state_copy, depth - 1, alpha, beta, False)
-            if score > max_score:
-                max_score = score
-                best_move = (x, y)
-            alpha = max(alpha, score)
+            if shared_alpha is not None:
+                alpha = max(alpha, float(shared_alpha[depth]))
+            board.make_move(x, y, color)
+            score, _ = self.minimax(board, depth - 1, alpha, beta, not is_ai_turn, ply + 1, (x, y))
+            board.unmake_move(x, y)
+            if self.stopped:
+                return 0, None
+            if is_ai_turn:
+                if score > best_score:
+                    best_score = score
+                    best_move = (x, y)
+                alpha = max(alpha, score)
+                if shared_alpha is not None and score > shared_alpha[depth]:
+                    shared_alpha[depth] = score
+            else:
+                if score < best_score:
+                    best_score = score
+                    best_move = (x, y)
+                beta = min(beta, score)
             if beta <= alpha:
+                self._record_cutoff((x, y), depth, ply)
+                break
+
+        if tt is not None and best_move is not None:
+            if best_score <= alpha_orig:
+                flag = TT_UPPER
+            elif best_score >= beta_orig:
+                flag = TT_LOWER
+            else:
+                flag = TT_EXACT
+            tt.store(key, depth, flag, best_score, best_move)
+        return best_score, best_move
+
+    # 迭代加深：每完成一層就更新最佳著法；時間到時回傳最後一個完整層的結果
+    def iterative_deepening(self, board, max_depth, is_ai_turn=True):
+        start = time.perf_counter()
+        color = WHITE if is_ai_turn else BLACK
+        moves = self.order_moves(board, self.root_moves or get_neighboring_moves(board), color, 0)
+        best_move, best_score, completed = moves[0], 0, 0
+        for depth in range(1, max_depth + 1):
+            iteration_start = time.perf_counter()
+            score, move = self.minimax(board, depth, float('-inf'), float('inf'), is_ai_turn)
+            if self.stopped or move is None:
+                break
+            best_move, best_score, completed = move, score, depth
+            self.completed.append((depth, score, move))
+            if abs(score) >= WIN_SCORE:
                 break
-        return max_score, best_move
+            if self.deadline is not None:
+                # 下一層通常比這一層慢數倍，剩餘時間不夠就不要開始
+                now = time.perf_counter()
+                if now + (now - iteration_start) * 3 > self.deadline:
+                    break
+        self.elapsed_ms = (time.perf_counter() - start) * 1000
+        return best_score, best_move, completed
+
+def minimax(board, depth, alpha, beta, is_ai_turn, tt=None):
+    return Search(tt).minimax(board, depth, alpha, beta, is_ai_turn)
+
+_process_pool = None
+_attached_tables = {}
+
+# 整個行程共用一個 ProcessPoolExecutor，第一次需要時建立，之後重複使用
+def get_process_pool(workers):
+    global _process_pool
+    if _process_pool is None or _process_pool._max_workers < workers:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False)
+        _process_pool = ProcessPoolExecutor(max_workers=workers)
+    return _process_pool
+
+def _root_search_worker(task):
+    stones, patterns, root_moves, max_depth, budget_ms, tt_info, alpha_info, max_candidates = task
+    board = Board(patterns)
+    for x, y, color in stones:
+        board.make_move(x, y, color)
+    tt = None
+    if tt_info is not None:
+        if tt_info[0] not in _attached_tables:
+            _attached_tables[tt_info[0]] = TranspositionTable.attach(*tt_info)
+        tt = _attached_tables[tt_info[0]]
+    alpha_shm = shared_memory.SharedMemory(name=alpha_info[0])
+    shared_alpha = np.ndarray(alpha_info[1], dtype=np.float64, buffer=alpha_shm.buf)
+    deadline = time.perf_counter() + budget_ms / 1000 if budget_ms else None
+    search = Search(tt, deadline, root_moves, shared_alpha, max_candidates)
+    search.iterative_deepening(board, max_depth)
+    del shared_alpha
+    alpha_shm.close()
+    return search.completed, search.nodes
+
+# 平行根節點分割：根著法依排序輪流分給各 worker，每個 worker 各自迭代加深，
+# 透過共享置換表與共享 alpha 交換資訊。採用所有 worker 都完成的最深一層中分數最高的著法。
+def parallel_root_search(board, workers, max_depth, budget_ms, tt=None, max_candidates=None):
+    search = Search(tt)
+    moves = search.order_moves(board, get_neighboring_moves(board), WHITE, 0)
+    workers = min(workers, len(moves))
+    alpha_shm = shared_memory.SharedMemory(create=True, size=(max_depth + 1) * 8)
+    try:
+        shared_alpha = np.ndarray(max_depth + 1, dtype=np.float64, buffer=alpha_shm.buf)
+        shared_alpha[:] = float('-inf')
+        stones = [(x, y, board.color_at(x, y)) for x, y in board.stones]
+        patterns = None if board.pattern_table is PATTERN_TABLE else board.pattern_table.patterns
+        tt_info = (tt.shm.name, tt.buckets) if tt is not None and tt.shm is not None else None
+        tasks = [(stones, patterns, moves[i::workers], max_depth, budget_ms, tt_info,
+                  (alpha_shm.name, max_depth + 1), max_candidates) for i in range(workers)]
+        results = list(get_process_pool(workers).map(_root_search_worker, tasks))
+        del shared_alpha
+    finally:
+        alpha_shm.close()
+        alpha_shm.unlink()
+    nodes = sum(n for _, n in results)
+    finished = [completed for completed, _ in results if completed]
+    if not finished:
+        return 0, moves[0], 0, nodes
+    depth = min(completed[-1][0] for completed in finished)
+    if any(completed[-1][0] == depth and abs(completed[-1][1]) >= WIN_SCORE for completed in finished):
+        depth = max(completed[-1][0] for completed in finished)
+    best_score, best_move = float('-inf'), moves[0]
+    for completed in finished:
+        for d, score, move in completed:
+            if d == depth and score > best_score:
+                best_score, best_move = score, move
+    return best_score, best_move, depth, nodes
+
+# 由 Board 增量維護的前緣取出候選點，依周圍棋子加權數排序；top_k 可限制數量，
+# 但任一方下一手成五的點（自己成五、擋對方成五）鄰近權重可能很低，一律附加在後面
+def get_neighboring_moves(board, top_k=None):
+    frontier = board.frontier
+    if not frontier:
+        return [(BOARD_SIZE // 2, BOARD_SIZE // 2)]
+    near = board.near
+    if top_k is not None and top_k < len(frontier):
+        ranked = heapq.nlargest(top_k, frontier, key=near.__getitem__)
+        white, black = board.bits[WHITE], board.bits[BLACK]
+        urgent = (five_completion_bits(white) | five_completion_bits(black)) & BOARD_MASK & ~(white | black)
+        while urgent:
+            low = urgent & -urgent
+            urgent ^= low
+            x, y = divmod(low.bit_length() - 1, BIT_ROW)
+            if x * BOARD_SIZE + y not in ranked:
+                ranked.append(x * BOARD_SIZE + y)
     else:
-        min_score = float('inf')
-        for x, y in moves:
-            state_copy = state.copy()
-            state_copy[(x, y)] = BLACK
-            score, _ = minimax(state_copy, depth - 1, alpha, beta, True)
-            if score < min_score:
-                min_score = score
-                best_move = (x, y)
-            beta = min(beta, score)
-            if beta <= alpha:
+        ranked = sorted(frontier, key=near.__getitem__, reverse=True)
+    return [divmod(idx, BOARD_SIZE) for idx in ranked]
+
+# 每格四個方向上 ±4 格（裁掉盤外）的一維切片：(slice, 該格在切片中的位置, 第一格座標, 方向)
+def _build_ray_slices():
+    rays = []
+    for x in range(BOARD_SIZE):
+        for y in range(BOARD_SIZE):
+            cell_rays = []
+            for dx, dy in DIRECTIONS:
+                ks = [k for k in range(-4, 5) if 0 <= x + dx * k < BOARD_SIZE and 0 <= y + dy * k < BOARD_SIZE]
+                lo, hi = ks[0], ks[-1]
+                start = (x + dx * lo) * BOARD_SIZE + (y + dy * lo)
+                step = dx * BOARD_SIZE + dy
+                cell_rays.append((slice(start, start + step * (hi - lo) + 1, step), -lo,
+                                  (x + dx * lo, y + dy * lo), (dx, dy)))
+            rays.append(cell_rays)
+    return rays
+
+RAY_SLICES = _build_ray_slices()
+
+# 在 (x, y) 已經是 color 的前提下，找出通過該格的四條線上、再下一手就成五的空格
+def five_cells_through(board, x, y, color):
+    cells = board.cells
+    result = set()
+    for sl, pos, (sx, sy), (dx, dy) in RAY_SLICES[x * BOARD_SIZE + y]:
+        line = cells[sl]
+        for start in range(max(0, pos - 4), min(pos, len(line) - 5) + 1):
+            window = line[start:start + 5]
+            if window.count(color) == 4 and window.count(EMPTY) == 1:
+                k = start + window.index(EMPTY)
+                result.add((sx + dx * k, sy + dy * k))
+    return result
+
+def makes_five(board, x, y, color):
+    idx = x * BOARD_SIZE + y
+    return has_five_through(board.bits[color] | CELL_BITS[idx], idx)
+
+def winning_cells(board, color, candidates=None):
+    if candidates is None:
+        candidates = get_neighboring_moves(board)
+    return [move for move in candidates if board.color_at(*move) == EMPTY and makes_five(board, move[0], move[1], color)]
+
+def _line_cells(board, x, y):
+    for dx, dy in DIRECTIONS:
+        for k in range(-4, 5):
+            nx, ny = x + dx * k, y + dy * k
+            if k and 0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE and board.cells[nx * BOARD_SIZE + ny] == EMPTY:
+                yield nx, ny
+
+# 只展開「四」（VCF）與「活三」（VCT）的威脅空間搜尋，有自己的節點數與時間上限。
+# 結果保守：只在所有防守（含對手反衝四）都被證明無效時才回報必勝著法，超出上限則回傳 None。
+def _earliest(*deadlines):
+    deadlines = [d for d in deadlines if d is not None]
+    return min(deadlines) if deadlines else None
+
+# 有時間預算時，威脅空間搜尋最多用掉預算的這個比例，其餘留給迭代加深
+THREAT_BUDGET_SHARE = 0.5
+
+# stop_event 被設定時和超過期限一樣立即停止（背景預想用來隨時中止）
+class ThreatSolver:
+    def __init__(self, max_nodes=20000, time_limit_ms=150, max_depth=12, vct=True, vct_width=8, stop_event=None):
+        self.max_nodes = max_nodes
+        self.time_limit_ms = time_limit_ms
+        self.max_depth = max_depth
+        self.vct = vct
+        self.vct_width = vct_width
+        self.stop_event = stop_event
+        self.nodes = 0
+        self.total_nodes = 0  # 跨多次 solve 的累計節點數（基準測試用）
+        self.stopped = False
+
+    # deadline 是呼叫端的整體期限，和本身的 time_limit_ms 取較早者
+    def solve(self, board, attacker, deadline=None):
+        self.nodes = 0
+        self.stopped = False
+        limit = time.perf_counter() + self.time_limit_ms / 1000 if self.time_limit_ms else None
+        self.deadline = _earliest(limit, deadline)
+        self.failed = {}
+        return self._attack(board, attacker, self.max_depth)
+
+    # attacker 有必勝威脅時，找一手能讓它失效的防守；找不到時退而佔據對方第一手的位置
+    def find_defence(self, board, defender, attacker, attacker_move, deadline=None):
+        candidates = [attacker_move] + [move for move in self._ordered(board, defender) if move != attacker_move]
+        limit = time.perf_counter() + self.time_limit_ms / 1000 if self.time_limit_ms else None
+        deadline = _earliest(limit, deadline)
+        for move in candidates[:self.vct_width * 2]:
+            if (deadline is not None and time.perf_counter() >= deadline) or self._cancelled():
                 break
-        return min_score, best_move
-
-def get_neighboring_moves(state):
-    candidates = set()
-    for (x, y), _ in state.items():
-        for dx in range(-2, 3):
-            for dy in range(-2, 3):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE:
-                    if (nx, ny) not in state:
-                        candidates.add((nx, ny))
-    return candidates if candidates else {(BOARD_SIZE // 2, BOARD_SIZE // 2)}
+            board.make_move(move[0], move[1], defender)
+            refuted = self.solve(board, attacker, deadline) is None and not self.stopped
+            board.unmake_move(move[0], move[1])
+            if refuted:
+                return move
+        return attacker_move
+
+    def _ordered(self, board, color):
+        moves = get_neighboring_moves(board)
+        return sorted(moves, key=lambda m: board.threat_score(m[0], m[1], color), reverse=True)
+
+    def _cancelled(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _expired(self):
+        if (self.deadline is not None and time.perf_counter() >= self.deadline) or self._cancelled():
+            self.stopped = True
+        return self.stopped
+
+    def _out_of_budget(self):
+        self.nodes += 1
+        self.total_nodes += 1
+        if self.nodes >= self.max_nodes:
+            self.stopped = True
+        return self._expired()
+
+    # 以下幾個試下只用 five_cells_through 讀 cells，直接寫格子即可，不必經過 make_move 重算線分數
+    def _has_open_four_move(self, board, x, y, color):
+        cells = board.cells
+        for ex, ey in _line_cells(board, x, y):
+            cells[ex * BOARD_SIZE + ey] = color
+            threats = len(five_cells_through(board, ex, ey, color))
+            cells[ex * BOARD_SIZE + ey] = EMPTY
+            if threats >= 2:
+                return True
+        return False
+
+    def _threat_moves(self, board, attacker):
+        fours, threes = [], []
+        cells = board.cells
+        for x, y in self._ordered(board, attacker):
+            # 展開一個節點要試下所有候選點，期限到了或被中止就不再往下試
+            if self._expired():
+                break
+            cells[x * BOARD_SIZE + y] = attacker
+            fives = five_cells_through(board, x, y, attacker)
+            if fives:
+                fours.append(((x, y), fives))
+            elif self.vct and len(threes) < self.vct_width and self._has_open_four_move(board, x, y, attacker):
+                threes.append(((x, y), None))
+            cells[x * BOARD_SIZE + y] = EMPTY
+        return fours + threes
+
+    def _attack(self, board, attacker, depth):
+        if self._out_of_budget():
+            return None
+        wins = winning_cells(board, attacker)
+        if wins:
+            return wins[0]
+        if depth <= 0:
+            return None
+        key = board.hash
+        if self.failed.get(key, -1) >= depth:
+            return None
+        defender = BLACK if attacker == WHITE else WHITE
+        blocks = winning_cells(board, defender)
+        if len(blocks) > 1:
+            return None
+        for move, fives in self._threat_moves(board, attacker):
+            if blocks and move != blocks[0]:
+                continue
+            board.make_move(move[0], move[1], attacker)
+            won = self._defend(board, attacker, defender, move, fives, depth - 1)
+            board.unmake_move(move[0], move[1])
+            if won:
+                return move
+            if self.stopped:
+                return None
+        self.failed[key] = depth
+        return None
+
+    def _defend(self, board, attacker, defender, move, fives, depth):
+        if fives is not None:
+            if len(fives) >= 2:
+                return True
+            replies = list(fives)
+        else:
+            replies = []
+            cells = board.cells
+            for d in list(_line_cells(board, move[0], move[1])):
+                cells[d[0] * BOARD_SIZE + d[1]] = defender
+                if not self._has_open_four_move(board, move[0], move[1], attacker):
+                    replies.append(d)
+                cells[d[0] * BOARD_SIZE + d[1]] = EMPTY
+            # 對手也可以用衝四反擊
+            for x, y in get_neighboring_moves(board):
+                if (x, y) in replies:
+                    continue
+                cells[x * BOARD_SIZE + y] = defender
+                if five_cells_through(board, x, y, defender):
+                    replies.append((x, y))
+                cells[x * BOARD_SIZE + y] = EMPTY
+        for x, y in replies:
+            board.make_move(x, y, defender)
+            result = self._attack(board, attacker, depth)
+            board.unmake_move(x, y)
+            if result is None:
+                return False
+        return True
 
 class GomokuAI:
-    def __init__(self):
-        self.state = {}
+    def __init__(self, max_depth=8, time_budget_ms=1000, tt_mb=16, threat_nodes=20000, threat_time_ms=150,
+                 workers=1, max_candidates=None, book_path=None, book_moves=10, ponder_width=8, ponder_min_depth=3,
+                 patterns=None):
+        self.max_depth = max_depth
+        self.book = OpeningBook(book_path) if book_path else None
+        self.book_moves = book_moves
+        self.max_candidates = max_candidates
+        self.time_budget_ms = time_budget_ms
+        self.workers = workers
+        self.tt = TranspositionTable(tt_mb, shared=workers > 1)
+        self.threat_solver = ThreatSolver(threat_nodes, threat_time_ms)
+        self.last_search = {}
+        self.state = Board(patterns)
         self.current_turn = BLACK
         self.history = []
+        self.ponder_width = ponder_width
+        self.ponder_min_depth = ponder_min_depth
+        self.ponder_results = {}
+        self._ponder_thread = None
+        self._ponder_stop = None
 
     def apply_move(self, x, y):
+        self.stop_pondering()
         x0, y0 = x - 1, y - 1
-        self.state[(x0, y0)] = self.current_turn
+        self.state.make_move(x0, y0, self.current_turn)
         self.history.append((x0, y0))
         self.current_turn = WHITE if self.current_turn == BLACK else BLACK
 
-    def ai_move(self):
-        _, move = minimax(self.state, depth=2, alpha=float('-inf'), beta=float('inf'), is_ai_turn=True)
+    def search(self, time_budget_ms=None):
+        start = time.perf_counter()
+        budget = self.time_budget_ms if time_budget_ms is None else time_budget_ms
+        self.stop_pondering()
+        threat_nodes = self.threat_solver.total_nodes
+        move, source = self.book_search()
+        depth = 0
+        if move is None:
+            move, source, depth = self.ponder_hit()
+        if move is None:
+            # 威脅搜尋也受整體時間預算限制，剩下的時間交給一般搜尋
+            threat_deadline = start + budget * THREAT_BUDGET_SHARE / 1000 if budget else None
+            move, source = self.threat_search(deadline=threat_deadline)
+            if source == "threat_win":
+                self.record_solved(move, self.threat_solver.max_depth, WIN_SCORE)
+        if move is not None:
+            self.last_search = {
+                "source": source,
+                "depth": depth,
+                "nodes": self.threat_solver.total_nodes - threat_nodes,
+                "score": WIN_SCORE if source in ("threat_win", "solved") else 0,
+                "elapsed_ms": (time.perf_counter() - start) * 1000,
+            }
+            return move
+        if self.workers > 1:
+            remaining_ms = budget - (time.perf_counter() - start) * 1000 if budget else None
+            score, move, depth, nodes = parallel_root_search(
+                self.state, self.workers, self.max_depth, max(remaining_ms, 1) if budget else None, self.tt,
+                self.max_candidates)
+        else:
+            deadline = start + budget / 1000 if budget else None
+            search = Search(self.tt, deadline, max_candidates=self.max_candidates)
+            score, move, depth = search.iterative_deepening(self.state, self.max_depth)
+            nodes = search.nodes
+        if abs(score) >= WIN_SCORE:
+            self.record_solved(move, depth, score)
+        self.last_search = {
+            "source": "search",
+            "depth": depth,
+            "nodes": nodes + self.threat_solver.total_nodes - threat_nodes,
+            "score": score,
+            "elapsed_ms": (time.perf_counter() - start) * 1000,
+        }
+        return move
+
+    # 一般搜尋之前先跑威脅空間搜尋：自己有連續衝四/活三的必勝就直接走，對手有就先防守
+    def threat_search(self, board=None, solver=None, deadline=None):
+        board = self.state if board is None else board
+        solver = self.threat_solver if solver is None else solver
+        if not board.stones:
+            return None, None
+        move = solver.solve(board, WHITE, deadline)
+        if move is not None:
+            return move, "threat_win"
+        opponent_move = solver.solve(board, BLACK, deadline)
+        if opponent_move is not None:
+            return solver.find_defence(board, WHITE, BLACK, opponent_move, deadline), "threat_defence"
+        return None, None
+
+    # 背景預想：AI 下完後，在玩家說話／語音辨識的空檔裡，對最可能的幾手回應先搜尋。
+    # 結果以回應後局面的 Zobrist key 存在 ponder_results，置換表也一併保留下來。
+    def start_pondering(self):
+        self.stop_pondering()
+        board = Board(self.state.pattern_table.patterns)
+        for x, y in self.state.stones:
+            board.make_move(x, y, self.state.color_at(x, y))
+        self.ponder_results = {}
+        self._ponder_stop = threading.Event()
+        self._ponder_thread = threading.Thread(target=self._ponder, args=(board, self._ponder_stop), daemon=True)
+        self._ponder_thread.start()
+
+    def stop_pondering(self):
+        if self._ponder_thread is not None:
+            self._ponder_stop.set()
+            self._ponder_thread.join()
+            self._ponder_thread = None
+
+    def _ponder(self, board, stop):
+        search = Search(self.tt, max_candidates=self.max_candidates, stop_event=stop)
+        solver = ThreatSolver(self.threat_solver.max_nodes, self.threat_solver.time_limit_ms, stop_event=stop)
+        replies = search.order_moves(board, get_neighboring_moves(board), BLACK, 0)[:self.ponder_width]
+        pending = []
+        for x, y in replies:
+            if stop.is_set():
+                return
+            board.make_move(x, y, BLACK)
+            if not check_win_fast(board, x, y):
+                move, source = self.threat_search(board, solver)
+                # 中途被中止的威脅搜尋結果不完整，不能存
+                if stop.is_set():
+                    board.unmake_move(x, y)
+                    return
+                if move is not None:
+                    self.ponder_results[board.hash] = (move, self.max_depth, source)
+                else:
+                    pending.append((x, y))
+            board.unmake_move(x, y)
+        # 逐層輪流加深每個預想局面，不論玩家下哪一手都有可用的結果
+        for depth in range(1, self.max_depth + 1):
+            for x, y in pending:
+                board.make_move(x, y, BLACK)
+                _, move = search.minimax(board, depth, float('-inf'), float('inf'), True, 0, (x, y))
+                if not search.stopped and move is not None:
+                    self.ponder_results[board.hash] = (move, depth, "ponder")
+                board.unmake_move(x, y)
+                if search.stopped:
+                    return
+
+    def ponder_hit(self):
+        hit = self.ponder_results.get(self.state.hash)
+        if hit is None:
+            return None, None, 0
+        move, depth, source = hit
+        if depth < self.ponder_min_depth or move in self.state:
+            return None, None, 0
+        return move, source, depth
+
+    def ai_move(self, time_budget_ms=None):
+        move = self.search(time_budget_ms)
         if move:
             self.apply_move(move[0]+1, move[1]+1)
             return (move[0]+1, move[1]+1)
         return None
 
     def check_win(self, x, y):
-        x0, y0 = x - 1, y - 1
-        color = self.state.get((x0, y0))
-        for dx, dy in DIRECTIONS:
-            count = 1
-            for dir in [1, -1]:
-                nx, ny = x0, y0
-                while True:
-                    nx += dx * dir
-                    ny += dy * dir
-                    if (nx, ny) in self.state and self.state[(nx, ny)] == color:
-                        count += 1
-                    else:
-                        break
-            if count >= 5:
-                return True
-        return False
+        return check_win_fast(self.state, x - 1, y - 1)
+
+    # 開局前幾手查開局庫，任何時候都先查已解局面快取；key 經過對稱標準化
+    def book_search(self):
+        if self.book is None:
+            return None, None
+        key, symmetry = canonical_key(self.state)
+        move = self.book.probe_book(key) if len(self.state) < self.book_moves else None
+        source = "book"
+        if move is None:
+            solved = self.book.probe_solved(key)
+            move = solved[0] if solved is not None and solved[2] > 0 else None
+            source = "solved"
+        if move is None:
+            return None, None
+        x, y = divmod(INVERSE_SYMMETRIES[symmetry][move], BOARD_SIZE)
+        if (x, y) in self.state:
+            return None, None
+        return (x, y), source
+
+    def record_solved(self, move, depth, score):
+        if self.book is None or move is None:
+            return
+        key, symmetry = canonical_key(self.state)
+        self.book.add(key, SYMMETRIES[symmetry][move[0] * BOARD_SIZE + move[1]], KIND_SOLVED,
+                      depth=min(depth, 127), score=score)
+
+    # 對局結束後把前 book_moves 手加進開局庫（勝方的著法記為勝）
+    def record_game(self, winner):
+        if self.book is None:
+            return
+        board = Board(self.state.pattern_table.patterns)
+        for x, y in self.history[:self.book_moves]:
+            color = self.state.color_at(x, y)
+            key, symmetry = canonical_key(board)
+            self.book.add(key, SYMMETRIES[symmetry][x * BOARD_SIZE + y], KIND_BOOK,
+                          visits=1, wins=int(color == winner))
+            board.make_move(x, y, color)
+        self.book.compact()
+
+    def close(self):
+        self.stop_pondering()
+        self.tt.close()
 
     def reset(self):
+        self.stop_pondering()
+        self.ponder_results = {}
         self.state.clear()
         self.history.clear()
         self.current_turn = BLACK
 
     def undo_last_two_moves(self):
+        self.stop_pondering()
         if len(self.history) < 2:
             return False
         for _ in range(2):
             last = self.history.pop()
-            self.state.pop(last, None)
+            if last in self.state:
+                self.state.unmake_move(*last)
         self.current_turn = BLACK
         return True
 
@@ -166,17 +1112,18 @@ class GomokuAI:
         color = WHITE if move_json["玩家棋子顏色"] == "白子" else BLACK
         x_str, y_str = move_json["下的格子"].split("之")
         x, y = int(x_str) - 1, int(y_str) - 1
+        self.stop_pondering()
 
         # ✅ 防止重複落子
         if (x, y) in self.state:
             return False
 
-        self.state[(x, y)] = color
+        self.state.make_move(x, y, color)
         self.history.append((x, y))
         return True
 
-    def get_best_move(self):
-        _, move = minimax(self.state, depth=2, alpha=float('-inf'), beta=float('inf'), is_ai_turn=True)
+    def get_best_move(self, time_budget_ms=None):
+        move = self.search(time_budget_ms)
         if move is None:
             move = (BOARD_SIZE // 2, BOARD_SIZE // 2)
         return {
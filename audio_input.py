@@ -0,0 +1,261 @@
+import argparse
+import collections
+import glob
+import json
+import os
+import time
+import wave
+
+import numpy as np
+import webrtcvad
+
+RATE = 16000
+SAMPLE_WIDTH = 2
+FRAME_MS = 30
+
+def pcm_to_float32(pcm_bytes):
+    # int16 直接在 buffer 上建視圖，只在轉成 Whisper 需要的 float32 時複製一次
+    pcm = np.frombuffer(pcm_bytes, dtype=np.int16)
+    return np.multiply(pcm, 1 / 32768, dtype=np.float32)
+
+def frame_bytes(frame_ms=FRAME_MS, rate=RATE):
+    return int(rate * frame_ms / 1000) * SAMPLE_WIDTH
+
+# 音源介面：read_frame() 每次回傳一個 frame_ms 長的 16 kHz 單聲道 int16 音框，沒有資料時回傳 None。
+# 音源在多次 record_and_segment 之間保持狀態，檔案與目錄重播會從上次停下的地方繼續。
+class AudioSource:
+    rate = RATE
+    frame_ms = FRAME_MS
+
+    def read_frame(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class MicrophoneSource(AudioSource):
+    def __init__(self, frame_ms=FRAME_MS):
+        import pyaudio
+        self.frame_ms = frame_ms
+        self.chunk = int(RATE * frame_ms / 1000)
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(format=pyaudio.paInt16, channels=1,
+                                      rate=RATE, input=True, frames_per_buffer=self.chunk)
+
+    def read_frame(self):
+        return self.stream.read(self.chunk, exception_on_overflow=False)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.audio.terminate()
+            self.stream = None
+
+# 把一段 PCM 切成音框，結尾補 tail_ms 的靜音讓斷句能觸發；realtime=True 時依實際時間送出
+class PcmSource(AudioSource):
+    def __init__(self, pcm=None, frame_ms=FRAME_MS, tail_ms=2000, realtime=False):
+        self.frame_ms = frame_ms
+        self.size = frame_bytes(frame_ms)
+        self.tail_ms = tail_ms
+        self.realtime = realtime
+        self.buffer = bytearray()
+        self.offset = 0
+        self._next_time = None
+        if pcm is not None:
+            self.append(pcm)
+
+    def append(self, pcm):
+        self.buffer += pcm
+        silence = int(RATE * self.tail_ms / 1000) * SAMPLE_WIDTH
+        self.buffer += bytes(silence)
+        # 補齊成整數個音框
+        self.buffer += bytes(-len(self.buffer) % self.size)
+
+    def refill(self):
+        return False
+
+    def read_frame(self):
+        while self.offset + self.size > len(self.buffer):
+            if not self.refill():
+                return None
+        frame = bytes(self.buffer[self.offset:self.offset + self.size])
+        self.offset += self.size
+        if self.offset > 1 << 22:
+            del self.buffer[:self.offset]
+            self.offset = 0
+        if self.realtime:
+            now = time.perf_counter()
+            self._next_time = max(self._next_time or now, now - 0.2) + self.frame_ms / 1000
+            if self._next_time > now:
+                time.sleep(self._next_time - now)
+        return frame
+
+def read_wav(path):
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != SAMPLE_WIDTH or wf.getframerate() != RATE:
+            raise ValueError(f"{path} 必須是 16 kHz、16-bit 單聲道 WAV")
+        return wf.readframes(wf.getnframes())
+
+class WavFileSource(PcmSource):
+    def __init__(self, path, frame_ms=FRAME_MS, tail_ms=2000, realtime=False):
+        self.path = path
+        super().__init__(read_wav(path), frame_ms, tail_ms, realtime)
+
+# 依檔名順序重播資料夾裡的 WAV，每個檔案後面接 tail_ms 靜音；loop=True 時播完重頭開始
+class DirectoryReplaySource(PcmSource):
+    def __init__(self, directory, pattern="*.wav", frame_ms=FRAME_MS, tail_ms=2000, realtime=False, loop=False):
+        self.paths = sorted(glob.glob(os.path.join(directory, pattern)))
+        if not self.paths:
+            raise FileNotFoundError(f"{directory} 裡沒有符合 {pattern} 的檔案")
+        self.loop = loop
+        self.index = 0
+        super().__init__(None, frame_ms, tail_ms, realtime)
+
+    def refill(self):
+        if self.index >= len(self.paths):
+            if not self.loop:
+                return False
+            self.index = 0
+        self.append(read_wav(self.paths[self.index]))
+        self.index += 1
+        return True
+
+# 合成音源：靜音與類語音（帶諧波、振幅起伏的聲音）交替，可用 seed 重現；count=None 表示無限產生
+class SyntheticSource(PcmSource):
+    def __init__(self, speech_ms=(1500, 2500), silence_ms=(300, 800), count=None, seed=0,
+                 frame_ms=FRAME_MS, tail_ms=2000, realtime=False):
+        self.rng = np.random.default_rng(seed)
+        self.speech_ms = speech_ms
+        self.silence_ms = silence_ms
+        self.remaining = count
+        super().__init__(None, frame_ms, tail_ms, realtime)
+
+    def utterance(self):
+        silence = int(RATE * self.rng.uniform(*self.silence_ms) / 1000)
+        n = int(RATE * self.rng.uniform(*self.speech_ms) / 1000)
+        t = np.arange(n) / RATE
+        pitch = self.rng.uniform(100, 220)
+        voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        envelope = 0.6 + 0.4 * np.sin(2 * np.pi * self.rng.uniform(3, 6) * t)
+        noise = self.rng.normal(0, 0.05, n)
+        speech = (voice * envelope * 0.25 + noise) * 32767 * 0.5
+        pcm = np.concatenate([np.zeros(silence), np.clip(speech, -32768, 32767)]).astype(np.int16)
+        return pcm.tobytes()
+
+    def refill(self):
+        if self.remaining is not None:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+        self.append(self.utterance())
+        return True
+
+# webrtcvad 斷句：先累積 padding_ms 的環形緩衝，有聲音框超過 80% 時開始收音，
+# 收音後無聲音框超過 80% 時結束。有聲／無聲音框數隨環形緩衝進出增量維護。
+class VadSegmenter:
+    def __init__(self, aggressiveness=2, padding_ms=1500, frame_ms=FRAME_MS):
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.padding_ms = padding_ms
+        self.frame_ms = frame_ms
+        self.frames = 0
+        self.voiced_frames = 0
+
+    # 回傳一段語音的 PCM（bytearray，音源結束且沒有語音時為空）；on_audio 的用法同 main.record_and_segment
+    def segment(self, source, on_audio=None, padding_ms=None):
+        num_padding = int((padding_ms or self.padding_ms) / self.frame_ms)
+        ring_buffer = collections.deque(maxlen=num_padding)
+        num_voiced = 0
+        triggered = False
+        voiced = bytearray()
+        speech_end = 0
+        while True:
+            frame = source.read_frame()
+            if frame is None:
+                break
+            is_speech = self.vad.is_speech(frame, source.rate)
+            self.frames += 1
+            self.voiced_frames += is_speech
+            if len(ring_buffer) == ring_buffer.maxlen:
+                num_voiced -= ring_buffer[0][1]
+            ring_buffer.append((frame, is_speech))
+            num_voiced += is_speech
+            if not triggered:
+                if num_voiced > 0.8 * ring_buffer.maxlen:
+                    triggered = True
+                    for f, s in ring_buffer:
+                        voiced += f
+                        if s:
+                            speech_end = len(voiced)
+                    ring_buffer.clear()
+                    num_voiced = 0
+            else:
+                voiced += frame
+                if is_speech:
+                    speech_end = len(voiced)
+                if len(ring_buffer) - num_voiced > 0.8 * ring_buffer.maxlen:
+                    break
+            if triggered and on_audio is not None:
+                on_audio(voiced, speech_end)
+        return voiced if triggered else bytearray()
+
+    @property
+    def unvoiced_frames(self):
+        return self.frames - self.voiced_frames
+
+def write_wav(path, pcm):
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(SAMPLE_WIDTH)
+        wf.setframerate(RATE)
+        wf.writeframes(pcm)
+
+def open_source(spec):
+    # "mic"、"synthetic[:數量]"、WAV 檔路徑或資料夾路徑
+    if spec == "mic":
+        return MicrophoneSource()
+    if spec.startswith("synthetic"):
+        _, _, count = spec.partition(":")
+        return SyntheticSource(count=int(count) if count else None)
+    if os.path.isdir(spec):
+        return DirectoryReplaySource(spec)
+    return WavFileSource(spec)
+
+# 不需要麥克風與模型的斷句吞吐量測試，結果以 JSON 輸出
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VAD 斷句吞吐量測試")
+    parser.add_argument("source", nargs="?", default="synthetic:50", help="mic、synthetic[:數量]、WAV 檔或資料夾")
+    parser.add_argument("--padding-ms", type=int, default=1500)
+    parser.add_argument("--aggressiveness", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    segmenter = VadSegmenter(args.aggressiveness, args.padding_ms)
+    durations = []
+    start = time.perf_counter()
+    with open_source(args.source) as source:
+        while True:
+            pcm = segmenter.segment(source)
+            if not pcm:
+                break
+            durations.append(len(pcm) / SAMPLE_WIDTH / RATE)
+    elapsed = time.perf_counter() - start
+    audio_seconds = segmenter.frames * segmenter.frame_ms / 1000
+    print(json.dumps({
+        "utterances": len(durations),
+        "frames": segmenter.frames,
+        "voiced_frames": segmenter.voiced_frames,
+        "unvoiced_frames": segmenter.unvoiced_frames,
+        "audio_seconds": audio_seconds,
+        "elapsed_seconds": elapsed,
+        "realtime_factor": audio_seconds / elapsed if elapsed else 0.0,
+        "mean_utterance_seconds": float(np.mean(durations)) if durations else 0.0,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
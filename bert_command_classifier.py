@@ -1,22 +1,322 @@
-from transformers import BertTokenizer, BertForSequenceClassification
-import torch
+import argparse
+import json
+import os
 import re
+from time import perf_counter
 
+import numpy as np
+
+from keyword_matcher import COMMAND_MATCHER
+
+ONNX_DIR = "onnx"
+# 中間層分類頭（early exit）的權重檔，放在 model_dir 底下
+EXIT_HEADS_FILE = "early_exit.npz"
+# predict_label 的類別編號
+LABEL_NAMES = ["非指令", "五子棋落子", "遊戲控制", "家具控制"]
+
+# 比對兩種後端時使用的範例語句（四種類別都有）
+SAMPLE_TEXTS = [
+    "黑子下在3之3", "白子放在5之7", "黑子下在十之十二", "我要下在8之8",
+    "悔棋", "回上一步", "重新開始", "再來一局", "結束遊戲", "我不玩了",
+    "把椅子放在左上角", "把沙發往右移一點", "移除花瓶", "把床轉90度", "電腦桌靠近電腦椅",
+    "今天天氣很好", "你好", "我想喝水", "等一下", "這首歌很好聽",
+]
+
+def onnx_model_path(model_dir, quantized=True):
+    return os.path.join(model_dir, ONNX_DIR, "model.int8.onnx" if quantized else "model.onnx")
+
+# 把 PyTorch 權重匯出成 ONNX，並做 int8 動態量化（只需執行一次，之後直接載入 onnx 檔）
+def export_onnx(model_dir="best_model", quantize=True, opset=14):
+    if quantize:
+        # onnxruntime.quantization 需要 onnx 套件；先 import，缺套件時在匯出 fp32 模型之前就失敗
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    import torch
+    from transformers import BertTokenizer, BertForSequenceClassification
+
+    out_dir = os.path.join(model_dir, ONNX_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = BertTokenizer.from_pretrained(model_dir)
+    model = BertForSequenceClassification.from_pretrained(model_dir)
+    model.config.return_dict = False
+    model.eval()
+
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    sample = tokenizer(["黑子下在三之三"], return_tensors="pt")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic_axes["logits"] = {0: "batch"}
+    fp32_path = onnx_model_path(model_dir, quantized=False)
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in names), fp32_path,
+                          input_names=names, output_names=["logits"],
+                          dynamic_axes=dynamic_axes, opset_version=opset)
+    if not quantize:
+        return fp32_path
+    quantize_dynamic(fp32_path, onnx_model_path(model_dir), weight_type=QuantType.QInt8)
+    return onnx_model_path(model_dir)
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+# 接在中間層的輕量分類頭：每個出口層一個線性層（作用在該層的 [CLS] 向量），
+# 另有校準用的溫度與提早離開的信心門檻（門檻為 inf 表示該層不提早離開）
+class ExitHeads:
+    def __init__(self, layers, weights, biases, temperatures=None, thresholds=None):
+        self.layers = [int(layer) for layer in layers]
+        self.index = {layer: i for i, layer in enumerate(self.layers)}
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.biases = np.asarray(biases, dtype=np.float32)
+        self.temperatures = np.ones(len(self.layers)) if temperatures is None else np.asarray(temperatures, dtype=np.float64)
+        self.thresholds = np.full(len(self.layers), np.inf) if thresholds is None else np.asarray(thresholds, dtype=np.float64)
+
+    def probs(self, i, cls):
+        return _softmax((cls @ self.weights[i] + self.biases[i]) / self.temperatures[i])
+
+    def save(self, path):
+        np.savez(path, layers=np.array(self.layers), weights=self.weights, biases=self.biases,
+                 temperatures=self.temperatures, thresholds=self.thresholds)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["layers"], data["weights"], data["biases"], data["temperatures"], data["thresholds"])
+
+# 多類別邏輯迴歸（先標準化再做梯度下降，最後把標準化併回權重）
+def _fit_linear(x, y, num_labels, l2=1e-3, steps=300, lr=0.5):
+    mean, std = x.mean(axis=0), x.std(axis=0) + 1e-6
+    z = (x - mean) / std
+    onehot = np.eye(num_labels)[y]
+    weights = np.zeros((x.shape[1], num_labels))
+    bias = np.zeros(num_labels)
+    for _ in range(steps):
+        grad = _softmax(z @ weights + bias) - onehot
+        weights -= lr * (z.T @ grad / len(z) + l2 * weights)
+        bias -= lr * grad.mean(axis=0)
+    weights = weights / std[:, None]
+    return weights, bias - mean @ weights
+
+# 在驗證集上找讓負對數似然最小的溫度
+def _fit_temperature(logits, y):
+    best, best_nll = 1.0, np.inf
+    for temperature in np.exp(np.linspace(np.log(0.25), np.log(4.0), 41)):
+        nll = -np.log(_softmax(logits / temperature)[np.arange(len(y)), y] + 1e-12).mean()
+        if nll < best_nll:
+            best, best_nll = temperature, nll
+    return best
+
+# 最低的門檻，使信心值不低於門檻的樣本與完整模型的一致率仍達 target；做不到時回傳 inf
+def _pick_threshold(confidence, agree, target):
+    order = np.argsort(-confidence, kind="stable")
+    confidence, agree = confidence[order], agree[order]
+    rate = np.cumsum(agree) / np.arange(1, len(agree) + 1)
+    threshold = np.inf
+    for k in range(len(confidence)):
+        # 同分的樣本一定一起離開，只在同分群組的結尾判斷
+        if k + 1 < len(confidence) and confidence[k + 1] == confidence[k]:
+            continue
+        if rate[k] >= target:
+            threshold = confidence[k]
+    return threshold
+
+# 由各層 [CLS] 向量訓練分類頭：features 為 {層: (n, hidden)}，labels 為標註，full_labels 為完整模型的預測。
+# 以 holdout 比例的資料校準溫度與門檻，並在同一份驗證集上模擬逐層提早離開，回傳 (ExitHeads, 報告)。
+def fit_heads_from_features(features, labels, full_labels, layers, num_labels=len(LABEL_NAMES),
+                            holdout=0.2, target_agreement=0.99, seed=0):
+    labels, full_labels = np.asarray(labels), np.asarray(full_labels)
+    order = np.random.default_rng(seed).permutation(len(labels))
+    cut = max(1, int(len(labels) * holdout))
+    dev, train = order[:cut], order[cut:]
+    weights, biases, temperatures, thresholds, per_layer = [], [], [], [], {}
+    for layer in layers:
+        x = np.asarray(features[layer], dtype=np.float64)
+        w, b = _fit_linear(x[train], labels[train], num_labels)
+        logits = x[dev] @ w + b
+        temperature = _fit_temperature(logits, labels[dev])
+        probs = _softmax(logits / temperature)
+        predicted = probs.argmax(axis=-1)
+        threshold = _pick_threshold(probs.max(axis=-1), predicted == full_labels[dev], target_agreement)
+        weights.append(w)
+        biases.append(b)
+        temperatures.append(temperature)
+        thresholds.append(threshold)
+        per_layer[layer] = {
+            "accuracy": float((predicted == labels[dev]).mean()),
+            "agreement": float((predicted == full_labels[dev]).mean()),
+            "temperature": float(temperature),
+            "threshold": None if np.isinf(threshold) else float(threshold),
+        }
+    heads = ExitHeads(layers, weights, biases, temperatures, thresholds)
+    return heads, {"train": len(train), "dev": len(dev), "layers": per_layer,
+                   "cascade": simulate_early_exit(heads, {l: features[l][dev] for l in layers},
+                                                  labels[dev], full_labels[dev])}
+
+# 在已抽好的特徵上模擬執行期的逐層提早離開：出口分布、與完整模型的一致率與平均執行層數
+def simulate_early_exit(heads, features, labels, full_labels, num_layers=12, threshold=None):
+    predicted = np.array(full_labels)
+    depth = np.full(len(predicted), num_layers)
+    remaining = np.ones(len(predicted), dtype=bool)
+    exits = {}
+    for i, layer in enumerate(heads.layers):
+        probs = heads.probs(i, np.asarray(features[layer], dtype=np.float32))
+        leave = remaining & (probs.max(axis=-1) >= (heads.thresholds[i] if threshold is None else threshold))
+        predicted[leave] = probs.argmax(axis=-1)[leave]
+        depth[leave] = layer
+        remaining &= ~leave
+        exits[layer] = int(leave.sum())
+    n = len(predicted)
+    return {
+        "exits": exits,
+        "full": int(remaining.sum()),
+        "agreement": float((predicted == np.asarray(full_labels)).mean()) if n else 1.0,
+        "accuracy": float((predicted == np.asarray(labels)).mean()) if n else 1.0,
+        "mean_layers": float(depth.mean()) if n else float(num_layers),
+        "disagreements": int((predicted != np.asarray(full_labels)).sum()),
+    }
+
+# backend="torch" 為原本的 PyTorch 全精度模型；backend="onnx" 使用 ONNX Runtime 跑 int8 量化模型
+# 並搭配 fast tokenizer，第一次使用時會自動匯出。num_threads 設定推論用的執行緒數。
+# early_exit=True 時（只支援 torch，需先用 fit-exits 訓練分類頭）predict_label 逐層前向，
+# 中間層分類頭的信心達到門檻就提早回傳；exit_threshold 可統一覆寫各層門檻。
+# 每 audit_every 次提早離開會把剩下的層跑完，記錄與完整模型不一致的結果。
 class BertCommandClassifier:
-    def __init__(self, model_dir="best_model"):
-        self.tokenizer = BertTokenizer.from_pretrained(model_dir)
-        self.model = BertForSequenceClassification.from_pretrained(model_dir)
-        self.model.eval()
+    def __init__(self, model_dir="best_model", backend="torch", num_threads=None, quantized=True,
+                 early_exit=False, exit_threshold=None, audit_every=20):
+        self.model_dir = model_dir
+        self.backend = backend
+        self.exit_heads = None
+        if early_exit:
+            if backend != "torch":
+                raise ValueError("early exit 需要逐層前向，只支援 torch 後端")
+            self.exit_heads = ExitHeads.load(os.path.join(model_dir, EXIT_HEADS_FILE))
+            self.exit_threshold = exit_threshold
+            self.audit_every = audit_every
+            self.exit_stats = {
+                "calls": 0,
+                "early": 0,
+                "exits": {layer: 0 for layer in self.exit_heads.layers},
+                "layers_run": 0,
+                "audited": 0,
+                "disagreements": 0,
+                "recent_disagreements": [],
+            }
+        if backend == "onnx":
+            import onnxruntime as ort
+            from transformers import BertTokenizerFast
+
+            path = onnx_model_path(model_dir, quantized)
+            if not os.path.exists(path):
+                export_onnx(model_dir, quantize=quantized)
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+                options.inter_op_num_threads = 1
+            self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+            self.input_names = {i.name for i in self.session.get_inputs()}
+            self.tokenizer = BertTokenizerFast.from_pretrained(model_dir)
+        elif backend == "torch":
+            import torch
+            from transformers import BertTokenizer, BertForSequenceClassification
+
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            self.tokenizer = BertTokenizer.from_pretrained(model_dir)
+            self.model = BertForSequenceClassification.from_pretrained(model_dir)
+            self.model.eval()
+        else:
+            raise ValueError(f"未知的 backend：{backend}")
+
+    # 回傳 (len(texts), 類別數) 的 logits
+    def logits(self, texts):
+        if self.backend == "onnx":
+            inputs = self.tokenizer(texts, return_tensors="np", truncation=True, padding=True)
+            feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in self.input_names}
+            return self.session.run(["logits"], feed)[0]
+        import torch
+        inputs = self.tokenizer(texts, return_tensors="pt", truncation=True, padding=True)
+        with torch.no_grad():
+            return self.model(**inputs).logits.numpy()
 
     def predict_label(self, text):
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True)
+        if self.exit_heads is not None:
+            return self._predict_early_exit(text)
+        return int(self.logits([text])[0].argmax())
+
+    # 單句不需要 padding，因此不用 attention mask
+    def _predict_early_exit(self, text):
+        import torch
+        heads, stats = self.exit_heads, self.exit_stats
+        bert = self.model.bert
+        inputs = self.tokenizer([text], return_tensors="pt", truncation=True)
+        stats["calls"] += 1
+        early = None
         with torch.no_grad():
-            outputs = self.model(**inputs)
-            logits = outputs.logits
-            predicted_class_id = logits.argmax(dim=-1).item()
-        return predicted_class_id
+            hidden = bert.embeddings(input_ids=inputs["input_ids"], token_type_ids=inputs.get("token_type_ids"))
+            for depth, layer in enumerate(bert.encoder.layer, 1):
+                output = layer(hidden)
+                hidden = output[0] if isinstance(output, tuple) else output
+                stats["layers_run"] += 1
+                if early is not None or depth not in heads.index:
+                    continue
+                i = heads.index[depth]
+                probs = heads.probs(i, hidden[0, 0].numpy())
+                threshold = heads.thresholds[i] if self.exit_threshold is None else self.exit_threshold
+                if probs.max() >= threshold:
+                    early = int(probs.argmax())
+                    stats["early"] += 1
+                    stats["exits"][depth] += 1
+                    if not self.audit_every or stats["early"] % self.audit_every:
+                        return early
+                    exit_depth = depth
+            full = int(self.model.classifier(bert.pooler(hidden))[0].argmax())
+        if early is not None:
+            stats["audited"] += 1
+            if early != full:
+                stats["disagreements"] += 1
+                stats["recent_disagreements"] = (stats["recent_disagreements"] +
+                                                 [{"text": text, "layer": exit_depth, "early": early, "full": full}])[-20:]
+        return full
+
+    def get_exit_stats(self):
+        if self.exit_heads is None:
+            return None
+        stats = json.loads(json.dumps(self.exit_stats))
+        calls = stats["calls"]
+        stats["exit_rate"] = stats["early"] / calls if calls else 0.0
+        stats["mean_layers"] = stats["layers_run"] / calls if calls else 0.0
+        stats["disagreement_rate"] = stats["disagreements"] / stats["audited"] if stats["audited"] else None
+        return stats
 
-    def to_gomoku_json(self, text):
+    # torch 後端：回傳 ({層: (n, hidden) 的 [CLS] 向量}, 完整模型的預測)，供訓練中間層分類頭
+    def layer_features(self, texts, layers, batch_size=32):
+        import torch
+        features = {layer: [] for layer in layers}
+        predicted = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(texts[start:start + batch_size], return_tensors="pt", truncation=True, padding=True)
+            with torch.no_grad():
+                outputs = self.model(**inputs, output_hidden_states=True)
+            for layer in layers:
+                features[layer].append(outputs.hidden_states[layer][:, 0].numpy())
+            predicted.extend(outputs.logits.argmax(dim=-1).tolist())
+        return {layer: np.concatenate(chunks) for layer, chunks in features.items()}, np.array(predicted)
+
+    # 批次分類：先依長度排序再切批，同一批的句子長度相近，動態 padding 浪費最少；回傳順序與輸入相同
+    def predict_labels(self, texts, batch_size=32):
+        texts = list(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        labels = [0] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            predicted = self.logits([texts[i] for i in batch]).argmax(axis=-1)
+            for i, label in zip(batch, predicted):
+                labels[i] = int(label)
+        return labels
+
+    # 以下的擷取函式不需要模型，規則快速路徑（command_grammar）也直接呼叫
+    @staticmethod
+    def to_gomoku_json(text):
         color = "白子" if "白" in text else "黑子"
         match = re.search(r"(\d{1,2})[之-](\d{1,2})", text)
         if match:
@@ -28,72 +328,133 @@ class BertCommandClassifier:
         else:
             return None
 
-    def to_game_control_json(self, text):
-        text = text.lower()
-        restart_keywords = ["再來", "再一局", "重新開始", "再玩一次"]
-        quit_keywords = ["不玩", "退出", "結束", "關掉"]
-        regret_keywords = ["悔棋", "倒退", "反悔", "上一步"]
-
-        if any(kw in text for kw in restart_keywords):
-            return {"type": "game_control", "遊戲指令": "重新開始"}
-        elif any(kw in text for kw in quit_keywords):
-            return {"type": "game_control", "遊戲指令": "終止遊戲"}
-        elif any(kw in text for kw in regret_keywords):
-            return {"type": "game_control", "遊戲指令": "悔棋"}
+    @staticmethod
+    def to_game_control_json(text):
+        commands = COMMAND_MATCHER.extract(text.lower()).get("game_control")
+        if commands:
+            return {"type": "game_control", "遊戲指令": commands[0]}
         return None
 
-    def to_furniture_control_json(self, text):
-        furniture_list = ["椅子", "電腦桌", "電腦椅", "電腦", "餐桌", "沙發", "花瓶", "床", "立燈"]
-        action_keywords = {
-            "放置": ["放", "擺"],
-            "移除": ["拿掉", "移除", "去掉", "丟掉"],
-            "移動": ["移", "挪", "靠", "搬"],
-            "轉向": ["轉", "轉向", "旋轉"]
-        }
-        direction_keywords = ["左", "右", "前", "後", "上", "下", "中間", "旁邊"]
-        distance_keywords = ["一點點", "稍微", "一點", "多一點", "很多"]
-        angle_keywords = ["90度", "180度", "45度", "270度"]
-
-        action = None
-        for key, variants in action_keywords.items():
-            if any(k in text for k in variants):
-                action = key
-                break
-        if not action:
-            return None
-
-        object1 = None
-        for obj in furniture_list:
-            if obj in text:
-                object1 = obj
-                break
-        if not object1:
+    # 一次掃描取出所有槽位；每個類別依詞彙表順序取第一個命中的詞
+    @staticmethod
+    def to_furniture_control_json(text):
+        slots = COMMAND_MATCHER.extract(text)
+        if "action" not in slots or "furniture" not in slots:
             return None
-
-        object2 = None
-        for obj in furniture_list:
-            if obj != object1 and obj in text:
-                object2 = obj
-                break
-
-        direction = next((d for d in direction_keywords if d in text), None)
-        distance = next((d for d in distance_keywords if d in text), None)
-        angle = next((a for a in angle_keywords if a in text), None)
+        furniture = slots["furniture"]
 
         result = {
             "type": "furniture_control",
-            "object1": object1,
-            "object2": object2,
-            "動作": action
+            "object1": furniture[0],
+            "object2": furniture[1] if len(furniture) > 1 else None,
+            "動作": slots["action"][0]
+        }
+        if "direction" in slots:
+            result["方向"] = slots["direction"][0]
+        if "distance" in slots:
+            result["距離"] = slots["distance"][0]
+        if "angle" in slots:
+            result["角度"] = slots["angle"][0]
+        if "position" in slots:
+            result["位置"] = slots["position"][0]
+        return result
+
+def _rss_mb():
+    # 目前行程的常駐記憶體；沒有 psutil 時在 Linux 讀 /proc，其他平台回傳 None
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+# 兩種後端的標籤一致性與載入時間、單句延遲、記憶體比較。
+# onnx 先測，torch 的記憶體增量因此包含 import torch 本身。
+def compare_backends(model_dir="best_model", texts=SAMPLE_TEXTS, num_threads=None, repeat=10):
+    report = {"texts": len(texts), "repeat": repeat}
+    labels = {}
+    for backend in ("onnx", "torch"):
+        rss_before = _rss_mb()
+        start = perf_counter()
+        classifier = BertCommandClassifier(model_dir, backend, num_threads)
+        load_seconds = perf_counter() - start
+        labels[backend] = [classifier.predict_label(text) for text in texts]
+        latencies = []
+        for _ in range(repeat):
+            for text in texts:
+                start = perf_counter()
+                classifier.predict_label(text)
+                latencies.append((perf_counter() - start) * 1000)
+        rss_after = _rss_mb()
+        report[backend] = {
+            "load_seconds": load_seconds,
+            "latency_ms_mean": float(np.mean(latencies)),
+            "latency_ms_p50": float(np.percentile(latencies, 50)),
+            "latency_ms_p95": float(np.percentile(latencies, 95)),
+            "rss_mb": rss_after - rss_before if rss_before is not None else None,
         }
-        if direction:
-            result["方向"] = direction
-        if distance:
-            result["距離"] = distance
-        if angle:
-            result["角度"] = angle
-        position_hints = ["左上角", "左下角", "右上角", "右下角", "中間"]
-        position = next((p for p in position_hints if p in text), None)
-        if position:
-            result["位置"] = position
-        return result
\ No newline at end of file
+        del classifier
+    mismatches = [{"text": text, "torch": a, "onnx": b}
+                  for text, a, b in zip(texts, labels["torch"], labels["onnx"]) if a != b]
+    report["parity"] = {
+        "agreement": 1 - len(mismatches) / len(texts) if texts else 1.0,
+        "mismatches": mismatches,
+    }
+    report["speedup"] = report["torch"]["latency_ms_mean"] / report["onnx"]["latency_ms_mean"]
+    return report
+
+# 從標註語料訓練中間層分類頭並校準門檻，存成 model_dir/early_exit.npz
+def fit_exit_heads(records, model_dir="best_model", layers=(2, 4, 6, 8), holdout=0.2,
+                   target_agreement=0.99, batch_size=32, seed=0):
+    records = [(text, int(label)) for text, label in records if label is not None]
+    classifier = BertCommandClassifier(model_dir, "torch")
+    texts = [text for text, _ in records]
+    features, full_labels = classifier.layer_features(texts, list(layers), batch_size)
+    heads, report = fit_heads_from_features(features, [label for _, label in records], full_labels,
+                                            list(layers), holdout=holdout,
+                                            target_agreement=target_agreement, seed=seed)
+    report["full_model_accuracy"] = float(np.mean(full_labels == np.array([label for _, label in records])))
+    heads.save(os.path.join(model_dir, EXIT_HEADS_FILE))
+    return heads, report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BERT 指令分類器：ONNX 匯出與後端比較")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="匯出 ONNX 並做 int8 動態量化")
+    export.add_argument("--model-dir", default="best_model")
+    export.add_argument("--no-quantize", action="store_true")
+    compare = sub.add_parser("compare", help="比較 torch 與 onnx 後端的標籤、延遲與記憶體")
+    compare.add_argument("--model-dir", default="best_model")
+    compare.add_argument("--threads", type=int, default=None)
+    compare.add_argument("--repeat", type=int, default=10)
+    compare.add_argument("--min-agreement", type=float, default=1.0, help="一致率低於此值時以錯誤碼結束")
+    fit = sub.add_parser("fit-exits", help="從標註語料訓練中間層分類頭（early exit）並校準門檻")
+    fit.add_argument("corpus", help="JSONL 檔，每行一個物件")
+    fit.add_argument("--model-dir", default="best_model")
+    fit.add_argument("--text-field", default="text")
+    fit.add_argument("--label-field", default="label")
+    fit.add_argument("--layers", default="2,4,6,8", help="加上分類頭的層，逗號分隔")
+    fit.add_argument("--holdout", type=float, default=0.2, help="用來校準的資料比例")
+    fit.add_argument("--target-agreement", type=float, default=0.99, help="提早離開的結果與完整模型的最低一致率")
+    args = parser.parse_args(argv)
+
+    if args.command == "fit-exits":
+        from command_eval import read_corpus
+        layers = [int(layer) for layer in args.layers.split(",")]
+        _, report = fit_exit_heads(read_corpus(args.corpus, args.text_field, args.label_field), args.model_dir,
+                                   layers, args.holdout, args.target_agreement)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+    if args.command == "export":
+        print(export_onnx(args.model_dir, quantize=not args.no_quantize))
+        return 0
+    report = compare_backends(args.model_dir, SAMPLE_TEXTS, args.threads, args.repeat)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["parity"]["agreement"] >= args.min_agreement else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+import json
+import os
+import socket
+import threading
+import time
+
+BUS_HOST = "127.0.0.1"
+BUS_PORT = 47821
+# 每個主題的備援檔保留最近幾則訊息，讀取端離線一下也不會漏掉
+HISTORY = 16
+
+# 原子寫檔：先寫暫存檔再 rename，讀取端不會讀到寫一半的內容。
+# Windows 上讀取端剛好開著檔案時 rename 會失敗，稍等後重試。
+def write_json_atomic(path, data, retries=5):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    for attempt in range(retries):
+        try:
+            os.replace(tmp, path)
+            return True
+        except PermissionError:
+            time.sleep(0.01 * (attempt + 1))
+    os.remove(tmp)
+    print(f"⚠️ 無法寫入 {path}")
+    return False
+
+# 指令匯流排：publish() 給每則訊息一個遞增的 seq，透過本機 TCP socket 以一行一則 JSON 推送給所有連線的
+# 讀取端（Unity 的 CommandBusReader），同時把該主題最近的訊息原子寫入 files 指定的備援檔。
+# 訊息格式 {"session", "seq", "topic", "payload"}；session 是匯流排啟動的時間（毫秒），
+# 讀取端據此分辨 Python 重新啟動後 seq 從頭算起的情況。
+# 新連線先收到一行 hello {"session", "seq", "hello": true, "latest": {主題: 最新 seq}}，接著是各主題最近的訊息；
+# 剛啟動的讀取端以 hello 當起點，不會把連上之前的舊指令再執行一次，斷線重連的讀取端則靠補送的訊息補齊。
+class CommandBus:
+    def __init__(self, files=None, port=BUS_PORT, host=BUS_HOST, history=HISTORY):
+        self.files = dict(files or {})
+        self.host = host
+        self.port = port
+        self.history = history
+        self.session = int(time.time() * 1000)
+        self.seq = 0
+        self.recent = {}
+        self.clients = []
+        self.server = None
+        self.lock = threading.Lock()
+
+    # 開始接受連線；連接埠被占用時只寫備援檔
+    def start(self):
+        try:
+            self.server = socket.create_server((self.host, self.port))
+        except OSError as e:
+            print(f"⚠️ 指令匯流排無法監聽 {self.host}:{self.port}（{e}），只寫備援檔")
+            return False
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return True
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # 讀取端卡住時不要拖住 publish，送不出去就斷線，讀取端重連後會收到補送的最近訊息
+            conn.settimeout(0.5)
+            # 先送 hello 與各主題最近的訊息再加入 clients，讀取端依 seq 丟掉已處理過的
+            with self.lock:
+                hello = {"session": self.session, "seq": self.seq, "hello": True,
+                         "latest": {topic: recent[-1]["seq"] for topic, recent in self.recent.items()}}
+                backlog = sorted((m for recent in self.recent.values() for m in recent), key=lambda m: m["seq"])
+                try:
+                    for message in [hello] + backlog:
+                        conn.sendall((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+                except OSError:
+                    conn.close()
+                    continue
+                self.clients.append(conn)
+
+    def publish(self, topic, payload):
+        with self.lock:
+            self.seq += 1
+            message = {"session": self.session, "seq": self.seq, "topic": topic, "payload": payload}
+            line = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+            for conn in list(self.clients):
+                try:
+                    conn.sendall(line)
+                except OSError:
+                    self.clients.remove(conn)
+                    conn.close()
+            recent = self.recent.setdefault(topic, [])
+            recent.append(message)
+            del recent[:-self.history]
+            path = self.files.get(topic)
+            if path:
+                write_json_atomic(path, {"session": self.session, "seq": self.seq, "messages": recent})
+            return self.seq
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        with self.lock:
+            for conn in self.clients:
+                conn.close()
+            self.clients = []
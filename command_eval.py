@@ -0,0 +1,133 @@
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from time import perf_counter
+
+import numpy as np
+
+from bert_command_classifier import LABEL_NAMES, BertCommandClassifier
+
+# 每個 worker 行程只載入一次分類器
+_classifier = None
+
+def _init_worker(model_dir, backend, num_threads):
+    global _classifier
+    _classifier = BertCommandClassifier(model_dir, backend, num_threads)
+
+def _classify_chunk(args):
+    texts, batch_size = args
+    start = perf_counter()
+    labels = _classifier.predict_labels(texts, batch_size)
+    return labels, (perf_counter() - start) * 1000
+
+def read_corpus(path, text_field="text", label_field="label"):
+    # 逐行讀取 JSONL，產生 (text, label 或 None)；沒有 text_field 的行略過
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = record.get(text_field)
+            if isinstance(text, str):
+                yield text, record.get(label_field)
+
+def _chunks(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+# 把語料以 chunk_size 句為一塊送去分類；workers > 1 時用行程池，最多同時送出 workers * 2 塊
+def evaluate(records, model_dir="best_model", backend="onnx", batch_size=32, chunk_size=256,
+             workers=1, num_threads=None, on_result=None):
+    num_labels = len(LABEL_NAMES)
+    confusion = np.zeros((num_labels, num_labels), dtype=np.int64)
+    predicted_counts = np.zeros(num_labels, dtype=np.int64)
+    chunk_ms, text_count, labelled = [], 0, 0
+    start = perf_counter()
+
+    def consume(chunk, labels, ms):
+        nonlocal text_count, labelled
+        chunk_ms.append(ms)
+        text_count += len(chunk)
+        for (text, expected), label in zip(chunk, labels):
+            predicted_counts[label] += 1
+            if expected is not None:
+                confusion[int(expected), label] += 1
+                labelled += 1
+            if on_result is not None:
+                on_result(text, expected, label)
+
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(model_dir, backend, num_threads)) as pool:
+            pending = []
+            for chunk in _chunks(records, chunk_size):
+                pending.append((chunk, pool.submit(_classify_chunk, ([t for t, _ in chunk], batch_size))))
+                if len(pending) >= workers * 2:
+                    chunk, future = pending.pop(0)
+                    consume(chunk, *future.result())
+            for chunk, future in pending:
+                consume(chunk, *future.result())
+    else:
+        _init_worker(model_dir, backend, num_threads)
+        for chunk in _chunks(records, chunk_size):
+            consume(chunk, *_classify_chunk(([t for t, _ in chunk], batch_size)))
+
+    elapsed = perf_counter() - start
+    report = {
+        "texts": text_count,
+        "seconds": elapsed,
+        "texts_per_second": text_count / elapsed if elapsed else 0.0,
+        "chunk_size": chunk_size,
+        "batch_size": batch_size,
+        "workers": workers,
+        "chunk_latency_ms": {
+            "p50": float(np.percentile(chunk_ms, 50)) if chunk_ms else 0.0,
+            "p95": float(np.percentile(chunk_ms, 95)) if chunk_ms else 0.0,
+            "p99": float(np.percentile(chunk_ms, 99)) if chunk_ms else 0.0,
+        },
+        "ms_per_text": sum(chunk_ms) / text_count if text_count else 0.0,
+        "predicted": dict(zip(LABEL_NAMES, predicted_counts.tolist())),
+    }
+    if labelled:
+        report["labelled"] = labelled
+        report["accuracy"] = float(np.trace(confusion)) / labelled
+        # 列為標註類別、欄為預測類別
+        report["confusion_matrix"] = {"labels": LABEL_NAMES, "matrix": confusion.tolist()}
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="以批次分類重新評分 JSONL 語料")
+    parser.add_argument("corpus", help="JSONL 檔，每行一個物件")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--label-field", default="label")
+    parser.add_argument("--model-dir", default="best_model")
+    parser.add_argument("--backend", choices=["onnx", "torch"], default="onnx")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=None, help="每個行程的推論執行緒數")
+    parser.add_argument("--predictions", help="逐句把預測結果寫成 JSONL")
+    args = parser.parse_args(argv)
+
+    out = open(args.predictions, "w", encoding="utf-8") if args.predictions else None
+
+    def write_prediction(text, expected, label):
+        out.write(json.dumps({"text": text, "label": expected, "predicted": label}, ensure_ascii=False) + "\n")
+
+    try:
+        report = evaluate(read_corpus(args.corpus, args.text_field, args.label_field), args.model_dir,
+                          args.backend, args.batch_size, args.chunk_size, args.workers, args.threads,
+                          write_prediction if out else None)
+    finally:
+        if out is not None:
+            out.close()
+    sys.stdout.write(json.dumps(report, ensure_ascii=False, indent=2) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import re
+
+from ai_gomoku import BOARD_SIZE
+from bert_command_classifier import BertCommandClassifier
+from keyword_matcher import COMMAND_MATCHER
+
+COORDINATE = re.compile(r"(\d{1,2})[之-](\d{1,2})")
+PUNCTUATION = re.compile(r"[\s，。！？、,.!?…~～]")
+
+# 各類別（編號同 LABEL_NAMES）計入覆蓋率的關鍵字類別
+INTENT_CATEGORIES = {
+    1: ("color", "move", "filler"),
+    2: ("game_control", "filler"),
+    3: ("furniture", "action", "direction", "distance", "angle", "position", "filler"),
+}
+
+def _coverage(length, spans):
+    covered = bytearray(length)
+    for start, end in spans:
+        covered[start:end] = b"\x01" * (end - start)
+    return sum(covered) / length
+
+# 規則文法解析（輸入為 normalize_text 之後的文字）。回傳 (狀態, 類別編號, 指令 JSON, 信心值)，
+# 狀態為 "parsed"、"ambiguous"（同時像多種指令，或有兩個座標、兩種指令詞）或 "no_parse"。
+# 信心值是去掉標點後，被該類別文法元素覆蓋的字數比例；有認不得的字（例如「不要」）就會降低。
+def parse_command(text):
+    text = PUNCTUATION.sub("", text.lower())
+    if not text:
+        return "no_parse", None, None, 0.0
+    spans = {}
+    for start, end, entry_id in COMMAND_MATCHER.scan(text):
+        spans.setdefault(COMMAND_MATCHER.entries[entry_id][1], []).append((start, end))
+    slots = COMMAND_MATCHER.extract(text)
+    coordinates = list(COORDINATE.finditer(text))
+
+    intents = []
+    if coordinates:
+        intents.append(1)
+    if "game_control" in slots:
+        intents.append(2)
+    if "furniture" in slots and "action" in slots:
+        intents.append(3)
+    if not intents:
+        return "no_parse", None, None, 0.0
+    if len(intents) > 1:
+        return "ambiguous", None, None, 0.0
+    label = intents[0]
+
+    matched = [span for category in INTENT_CATEGORIES[label] for span in spans.get(category, ())]
+    if label == 1:
+        if len(coordinates) > 1 or len(slots.get("color", ())) > 1:
+            return "ambiguous", label, None, 0.0
+        x, y = int(coordinates[0].group(1)), int(coordinates[0].group(2))
+        if not (1 <= x <= BOARD_SIZE and 1 <= y <= BOARD_SIZE):
+            return "no_parse", label, None, 0.0
+        matched.append(coordinates[0].span())
+        command = BertCommandClassifier.to_gomoku_json(text)
+    elif label == 2:
+        if len(slots["game_control"]) > 1:
+            return "ambiguous", label, None, 0.0
+        command = BertCommandClassifier.to_game_control_json(text)
+    else:
+        command = BertCommandClassifier.to_furniture_control_json(text)
+    return "parsed", label, command, _coverage(len(text), matched)
@@ -0,0 +1,244 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from ai_gomoku import BLACK, BOARD_SIZE, WHITE, GomokuAI, check_win_fast, pattern_scores
+
+# 自我對弈用的預設引擎參數：一般搜尋固定深度、不限時間，只有威脅搜尋保留節點與時間上限
+# （威脅搜尋每個節點都要展開所有候選點，不設時間上限時偶爾會一手想上數十秒）
+PLAYER_DEFAULTS = {
+    "max_depth": 2,
+    "time_budget_ms": 0,
+    "tt_mb": 4,
+    "max_candidates": 12,
+    "threat_nodes": 300,
+    "threat_time_ms": 30,
+}
+
+# 每個 worker 行程各自保留引擎實例，換局時只 reset，不重建置換表與查表
+_PLAYERS = {}
+
+def make_player(spec):
+    # spec: {"patterns": {pattern: 分數, ...}（覆蓋 pattern_scores 的部分項目）, 其他為 GomokuAI 參數}
+    options = dict(PLAYER_DEFAULTS)
+    options.update({k: v for k, v in spec.items() if k != "patterns"})
+    patterns = dict(pattern_scores)
+    patterns.update(spec.get("patterns", {}))
+    return GomokuAI(patterns=patterns, **options)
+
+def _get_player(name, spec, color):
+    # 同一設定自己打自己時兩邊需要不同實例，所以以 (名稱, 顏色) 當 key
+    key = (name, color)
+    if key not in _PLAYERS:
+        _PLAYERS[key] = make_player(spec)
+    ai = _PLAYERS[key]
+    ai.reset()
+    ai.tt.clear()
+    return ai
+
+def random_opening(seed, stones, radius=3):
+    # 以 seed 決定開局：中央 (2*radius+1)^2 範圍內隨機落下 stones 顆棋，黑白輪流
+    rng = np.random.default_rng(seed)
+    center = BOARD_SIZE // 2
+    cells = [(x, y) for x in range(center - radius, center + radius + 1)
+             for y in range(center - radius, center + radius + 1)]
+    picks = rng.choice(len(cells), size=stones, replace=False)
+    return [cells[i] for i in picks]
+
+def _place(players, color, x, y):
+    # GomokuAI 永遠以白子思考：每個引擎眼中自己的棋是白子、對手的是黑子
+    for own, ai in players.items():
+        label = "白子" if own == color else "黑子"
+        ai.apply_json_move({"玩家棋子顏色": label, "下的格子": f"{x + 1}之{y + 1}"})
+
+def play_game(task):
+    start = time.perf_counter()
+    names = {BLACK: task["black"], WHITE: task["white"]}
+    players = {color: _get_player(names[color], task["specs"][names[color]], color) for color in (BLACK, WHITE)}
+    color = BLACK
+    winner = None
+    moves = []
+    for x, y in random_opening(task["seed"], task["opening"]):
+        _place(players, color, x, y)
+        moves.append(x * BOARD_SIZE + y)
+        color = WHITE if color == BLACK else BLACK
+    while len(moves) < task["max_plies"]:
+        move = players[color].search()
+        if move is None:
+            break
+        x, y = move
+        _place(players, color, x, y)
+        moves.append(x * BOARD_SIZE + y)
+        if check_win_fast(players[color].state, x, y):
+            winner = color
+            break
+        color = WHITE if color == BLACK else BLACK
+    return {
+        "g": task["game"],
+        "seed": task["seed"],
+        "black": names[BLACK],
+        "white": names[WHITE],
+        "winner": None if winner is None else ("black" if winner == BLACK else "white"),
+        "plies": len(moves),
+        "ms": round((time.perf_counter() - start) * 1000),
+        "moves": moves,
+    }
+
+def schedule(names, games_per_pair, seed=0, opening=4, max_plies=BOARD_SIZE * BOARD_SIZE):
+    # 循環賽：每組配對以同一個開局各執黑一次，抵銷開局與先手的優勢
+    pairs = [(a, b) for i, a in enumerate(names) for b in names[i + 1:]]
+    tasks = []
+    game = 0
+    for pair_id, (a, b) in enumerate(pairs):
+        for k in range((games_per_pair + 1) // 2):
+            game_seed = (seed * len(pairs) + pair_id) * 1000003 + k
+            for black, white in ((a, b), (b, a)):
+                tasks.append({"game": game, "seed": game_seed, "black": black, "white": white,
+                              "opening": opening, "max_plies": max_plies})
+                game += 1
+    return tasks
+
+def spec_hash(spec):
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+
+# 每筆結果記下這次對弈的 run 編號與雙方參數的雜湊，同一個名稱換了參數也不會被併成同一位選手
+def run_arena(specs, games_per_pair=100, workers=None, seed=0, opening=4, max_plies=120, results_path=None,
+              progress=None, run_id=None):
+    tasks = schedule(list(specs), games_per_pair, seed, opening, max_plies)
+    for task in tasks:
+        task["specs"] = specs
+    run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{seed}"
+    hashes = {name: spec_hash(spec) for name, spec in specs.items()}
+    records = []
+    out = open(results_path, "a", encoding="utf-8") if results_path else None
+    try:
+        with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+            futures = [pool.submit(play_game, task) for task in tasks]
+            for future in as_completed(futures):
+                record = future.result()
+                record.update(run=run_id, black_spec=hashes[record["black"]], white_spec=hashes[record["white"]])
+                records.append(record)
+                if out is not None:
+                    out.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    out.flush()
+                if progress is not None:
+                    progress(len(records), len(tasks))
+    finally:
+        if out is not None:
+            out.close()
+    return records
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1) + 0.0
+
+# 選手以名稱識別；同一個名稱在結果裡出現過不同參數時，改用「名稱#參數雜湊」區分
+def _player_labels(records):
+    seen = {}
+    for r in records:
+        for side in ("black", "white"):
+            seen.setdefault(r[side], set()).add(r.get(f"{side}_spec"))
+    return lambda r, side: r[side] if len(seen[r[side]]) == 1 else f"{r[side]}#{r.get(side + '_spec')}"
+
+# 每組配對以名稱排序在前者的角度統計勝負和，Elo 差與 95% 信賴區間由得分率的常態近似換算
+def summarize(records, z=1.96):
+    pairs = {}
+    black_wins = white_wins = draws = 0
+    label = _player_labels(records)
+    for r in records:
+        if r["winner"] == "black":
+            black_wins += 1
+        elif r["winner"] == "white":
+            white_wins += 1
+        else:
+            draws += 1
+        black, white = label(r, "black"), label(r, "white")
+        a, b = sorted((black, white))
+        if a == b:
+            continue
+        stats = pairs.setdefault((a, b), [0, 0, 0])
+        winner = black if r["winner"] == "black" else white if r["winner"] == "white" else None
+        stats[0 if winner == a else 1 if winner == b else 2] += 1
+    summary = []
+    for (a, b), (wins, losses, pair_draws) in sorted(pairs.items()):
+        n = wins + losses + pair_draws
+        score = (wins + pair_draws / 2) / n
+        variance = (wins * (1 - score) ** 2 + losses * score ** 2 + pair_draws * (0.5 - score) ** 2) / n
+        margin = z * math.sqrt(variance / n)
+        summary.append({
+            "player": a,
+            "opponent": b,
+            "games": n,
+            "wins": wins,
+            "losses": losses,
+            "draws": pair_draws,
+            "score": score,
+            "elo": elo_from_score(score),
+            "elo_ci95": [elo_from_score(score - margin), elo_from_score(score + margin)],
+        })
+    return {
+        "games": len(records),
+        "black_wins": black_wins,
+        "white_wins": white_wins,
+        "draws": draws,
+        "mean_plies": float(np.mean([r["plies"] for r in records])) if records else 0.0,
+        "pairs": summary,
+    }
+
+def parse_player(text):
+    # NAME=JSON 或 NAME=@檔案路徑
+    name, _, value = text.partition("=")
+    if value.startswith("@"):
+        with open(value[1:], encoding="utf-8") as f:
+            value = f.read()
+    return name, json.loads(value) if value else {}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="五子棋引擎自我對弈，用來調整 pattern_scores")
+    parser.add_argument("--player", action="append", type=parse_player, default=[],
+                        help='NAME=JSON，例如 strong4=\'{"patterns": {"011112": 20000}}\'，可重複')
+    parser.add_argument("--games", type=int, default=100, help="每組配對的局數（雙方輪流執黑）")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--opening", type=int, default=4, help="隨機開局的棋子數")
+    parser.add_argument("--max-plies", type=int, default=120, help="超過這個手數判和")
+    parser.add_argument("--results", default="arena_results.jsonl", help="逐局附加寫入的結果檔")
+    parser.add_argument("--report", action="store_true", help="不對弈，統計結果檔裡所有（或 --run 指定的）對局")
+    parser.add_argument("--run", help="這次對弈的編號（預設為時間與 seed）；搭配 --report 時只統計該次")
+    args = parser.parse_args(argv)
+
+    if not args.report:
+        specs = {"base": {}}
+        specs.update(dict(args.player))
+        if len(specs) < 2:
+            parser.error("至少需要一個 --player 與 base 對戰")
+        started = time.perf_counter()
+
+        def progress(done, total):
+            sys.stderr.write(f"\r{done}/{total} 局，{time.perf_counter() - started:.0f} 秒")
+            if done == total:
+                sys.stderr.write("\n")
+
+        # 結果檔會累積多次對弈，這裡只統計這一次的結果
+        records = run_arena(specs, args.games, args.workers, args.seed, args.opening, args.max_plies,
+                            args.results, progress, args.run)
+    else:
+        records = load_results(args.results)
+        if args.run:
+            records = [r for r in records if r.get("run") == args.run]
+    summary = summarize(records)
+    sys.stdout.write(json.dumps(summary, ensure_ascii=False, indent=2) + "\n")
+
+if __name__ == "__main__":
+    main()
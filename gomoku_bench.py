@@ -0,0 +1,165 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from ai_gomoku import GomokuAI
+
+# 固定的基準局面：moves 從黑子開始輪流落子（格式同 JSON 指令的「x之y」），
+# 最後一手是黑子，輪到 AI（白子）；expected 是可接受的最佳著法。
+CORPUS = [
+    {
+        "name": "opening_first_reply",
+        "phase": "opening",
+        "moves": ["8之8"],
+        "expected": ["7之7", "7之8", "7之9", "8之7", "8之9", "9之7", "9之8", "9之9"],
+    },
+    {
+        "name": "opening_block_open_three",
+        "phase": "opening",
+        "moves": ["8之6", "7之7", "8之7", "9之9", "8之8"],
+        "expected": ["8之5", "8之9"],
+    },
+    {
+        "name": "opening_block_diagonal_three",
+        "phase": "opening",
+        "moves": ["8之8", "8之9", "9之9", "7之9", "10之10"],
+        "expected": ["7之7", "11之11"],
+    },
+    {
+        "name": "middle_block_four",
+        "phase": "middlegame",
+        "moves": ["8之4", "8之3", "8之5", "9之6", "8之6", "10之7", "8之7"],
+        "expected": ["8之8"],
+    },
+    {
+        "name": "middle_win_open_four",
+        "phase": "middlegame",
+        "moves": ["10之10", "5之5", "10之11", "5之6", "11之10", "5之7", "3之12", "5之8", "12之13"],
+        "expected": ["5之4", "5之9"],
+    },
+    {
+        "name": "middle_win_before_block",
+        "phase": "middlegame",
+        "moves": ["9之5", "6之6", "9之6", "6之7", "9之7", "6之8", "4之4", "6之9", "9之8"],
+        "expected": ["6之5", "6之10"],
+    },
+    {
+        "name": "late_block_split_four",
+        "phase": "late",
+        "moves": ["7之7", "7之8", "8之8", "6之6", "9之9", "10之10", "8之6", "9之7", "6之8",
+                  "5之9", "8之7", "8之9", "6之9", "5之10", "4之7", "7之10", "5之7"],
+        "expected": ["6之7"],
+    },
+    {
+        "name": "late_crowded_centre",
+        "phase": "late",
+        "moves": ["8之8", "7之7", "8之9", "8之7", "9之8", "7之8", "9之7", "10之6", "7之9",
+                  "6之10", "9之9", "10之10", "10之8", "11之8", "6之8", "5之8", "9之6", "9之10", "12之12"],
+        "expected": ["9之5"],
+    },
+]
+
+# 預設比較的引擎設定（GomokuAI 的建構參數）
+CONFIGS = {
+    "default": {},
+    "narrow": {"max_candidates": 12},
+    "no_threat": {"threat_nodes": 0},
+}
+
+def parse_move(text):
+    x_str, y_str = text.split("之")
+    return int(x_str), int(y_str)
+
+def setup_position(ai, position):
+    ai.reset()
+    ai.tt.clear()
+    for i, text in enumerate(position["moves"]):
+        color = "黑子" if i % 2 == 0 else "白子"
+        if not ai.apply_json_move({"玩家棋子顏色": color, "下的格子": text}):
+            raise ValueError(f"{position['name']}：{text} 已有棋子")
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+def run_config(name, kwargs, corpus=CORPUS, budget_ms=1000, repeat=3):
+    ai = GomokuAI(time_budget_ms=budget_ms, **kwargs)
+    positions, wall_ms = [], []
+    total_nodes, total_seconds = 0, 0.0
+    try:
+        for position in corpus:
+            runs = []
+            for _ in range(repeat):
+                setup_position(ai, position)
+                start = time.perf_counter()
+                result = ai.get_best_move(budget_ms)
+                elapsed = time.perf_counter() - start
+                wall_ms.append(elapsed * 1000)
+                runs.append((result["下的格子"], elapsed, dict(ai.last_search)))
+            move, _, info = runs[-1]
+            nodes = sum(r[2].get("nodes", 0) for r in runs)
+            seconds = sum(r[1] for r in runs)
+            total_nodes += nodes
+            total_seconds += seconds
+            positions.append({
+                "name": position["name"],
+                "phase": position["phase"],
+                "move": move,
+                "expected": position["expected"],
+                "correct": move in position["expected"] if position["expected"] else None,
+                "source": info.get("source"),
+                "depth": info.get("depth", 0),
+                "nodes": nodes // repeat,
+                "nodes_per_second": nodes / seconds if seconds else 0.0,
+                "wall_ms_p50": percentile([r[1] * 1000 for r in runs], 50),
+            })
+    finally:
+        ai.close()
+    checked = [p for p in positions if p["correct"] is not None]
+    return {
+        "config": name,
+        "params": kwargs,
+        "budget_ms": budget_ms,
+        "repeat": repeat,
+        "solved": sum(p["correct"] for p in checked),
+        "checked": len(checked),
+        "nodes": total_nodes,
+        "nodes_per_second": total_nodes / total_seconds if total_seconds else 0.0,
+        "mean_depth": float(np.mean([p["depth"] for p in positions])) if positions else 0.0,
+        "wall_ms_p50": percentile(wall_ms, 50),
+        "wall_ms_p95": percentile(wall_ms, 95),
+        "positions": positions,
+    }
+
+def run_benchmark(configs=CONFIGS, corpus=CORPUS, budget_ms=1000, repeat=3):
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": [run_config(name, kwargs, corpus, budget_ms, repeat) for name, kwargs in configs.items()],
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="五子棋 AI 基準測試，結果以 JSON 輸出")
+    parser.add_argument("--budget-ms", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--config", action="append", choices=sorted(CONFIGS), help="只跑指定設定，可重複")
+    parser.add_argument("--phase", choices=["opening", "middlegame", "late"])
+    parser.add_argument("--output", help="寫入檔案，預設輸出到 stdout")
+    args = parser.parse_args(argv)
+
+    configs = {name: CONFIGS[name] for name in args.config} if args.config else CONFIGS
+    corpus = [p for p in CORPUS if args.phase is None or p["phase"] == args.phase]
+    report = run_benchmark(configs, corpus, args.budget_ms, args.repeat)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
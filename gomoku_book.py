@@ -0,0 +1,201 @@
+import glob
+import os
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 開局庫／已解局面快取的檔案格式：
+#   24 bytes 表頭（MAGIC + 筆數 + 世代），後面是依 key 排序的固定長度紀錄。
+# 主檔以 np.memmap 唯讀開啟，多個行程共用同一份 page cache，啟動時不需載入。
+# 新結果先附加到 <path>.log，compact() 時才合併、排序並以 rename 原子替換主檔。
+# 每次 compact() 世代加一，合併中的 log 改名為 <path>.log.merging.<世代>；
+# 中止後留下的檔案世代不大於主檔時表示已經併入，直接刪除，不會重複累加。
+MAGIC = b"GMKBOOK2"
+HEADER_SIZE = 24
+LEGACY_MAGIC = b"GMKBOOK1"  # 沒有世代欄位的舊格式，表頭 16 bytes
+LEGACY_HEADER_SIZE = 16
+RECORD = np.dtype([
+    ("key", "<u8"),
+    ("score", "<f4"),
+    ("visits", "<u4"),
+    ("wins", "<u4"),
+    ("move", "<i2"),
+    ("depth", "i1"),
+    ("kind", "i1"),
+])
+
+KIND_BOOK = 0    # 對局統計：visits/wins
+KIND_SOLVED = 1  # 搜尋結果：depth/score
+
+# compact() 用作業系統的檔案鎖：持有鎖的行程結束（包括被強制終止）時鎖會自動釋放，不會留下永遠鎖住的檔案
+def _try_lock(fd):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+class OpeningBook:
+    def __init__(self, path, min_visits=2, min_win_rate=0.5):
+        self.path = path
+        self.min_win_rate = min_win_rate
+        self.log_path = path + ".log"
+        self.lock_path = path + ".lock"
+        self.min_visits = min_visits
+        self.records = None
+        self.keys = None
+        self.generation = 0
+        self._stat = None
+        self.pending = {}
+        self.refresh()
+
+    def refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.records, self.keys, self._stat = None, None, None
+            self.generation = 0
+            return
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if signature == self._stat:
+            return
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if header[:8] == MAGIC:
+            count, self.generation = (int(n) for n in np.frombuffer(header, dtype="<u8", count=2, offset=8))
+            offset = HEADER_SIZE
+        elif header[:8] == LEGACY_MAGIC:
+            count, self.generation = int(np.frombuffer(header, dtype="<u8", count=1, offset=8)[0]), 0
+            offset = LEGACY_HEADER_SIZE
+        else:
+            raise ValueError(f"不是開局庫檔案：{self.path}")
+        self.records = np.memmap(self.path, dtype=RECORD, mode="r", offset=offset, shape=(count,)) if count else None
+        self.keys = self.records["key"] if count else None
+        # 主檔被其他行程 compact 過，附加紀錄已併入主檔
+        if self._stat is not None:
+            self.pending.clear()
+        self._stat = signature
+
+    def entries(self, key):
+        self.refresh()
+        found = []
+        if self.keys is not None:
+            lo = int(np.searchsorted(self.keys, key, side="left"))
+            hi = int(np.searchsorted(self.keys, key, side="right"))
+            found.extend(self.records[lo:hi].tolist())
+        found.extend(self.pending.get(key, ()))
+        return found
+
+    # 已解局面：回傳 (move, depth, score)，取最深的一筆
+    def probe_solved(self, key, min_depth=0):
+        best = None
+        for _, score, _, _, move, depth, kind in self.entries(key):
+            if kind == KIND_SOLVED and depth >= min_depth and (best is None or depth > best[1]):
+                best = (move, depth, score)
+        return best
+
+    # 開局庫：依勝率（加一平滑）挑選走過至少 min_visits 次的著法，勝率太低就不用
+    def probe_book(self, key):
+        totals = {}
+        for _, _, visits, wins, move, _, kind in self.entries(key):
+            if kind == KIND_BOOK:
+                v, w = totals.get(move, (0, 0))
+                totals[move] = (v + visits, w + wins)
+        candidates = [((w + 1) / (v + 2), move) for move, (v, w) in totals.items() if v >= self.min_visits]
+        if not candidates or max(candidates)[0] < self.min_win_rate:
+            return None
+        return max(candidates)[1]
+
+    def add(self, key, move, kind, visits=0, wins=0, depth=0, score=0.0):
+        record = (key, score, visits, wins, move, depth, kind)
+        self.pending.setdefault(key, []).append(record)
+        # O_APPEND 寫入單筆小紀錄，多個行程同時附加也不會互相覆蓋
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            os.write(fd, np.array([record], dtype=RECORD).tobytes())
+        finally:
+            os.close(fd)
+
+    def compact(self):
+        fd = os.open(self.lock_path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            if not _try_lock(fd):
+                return False
+            try:
+                return self._compact_locked()
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def _compact_locked(self):
+        self.refresh()
+        generation = self.generation + 1
+        merging = f"{self.log_path}.merging.{generation}"
+        # 上一個合併中途被中止的行程留下的紀錄：主檔還沒換成它的世代就和這次的 log 一起合併，換過了就已經併入
+        leftover = b""
+        for path in glob.glob(glob.escape(self.log_path) + ".merging.*"):
+            if path == merging:
+                with open(path, "rb") as f:
+                    leftover = f.read()
+            else:
+                os.remove(path)
+        try:
+            os.replace(self.log_path, merging)
+            with open(merging, "rb") as f:
+                data = leftover + f.read()
+        except FileNotFoundError:
+            data = leftover
+        if not data:
+            return False
+        new = np.frombuffer(data, dtype=RECORD, count=len(data) // RECORD.itemsize)
+        old = np.array(self.records) if self.records is not None else np.zeros(0, dtype=RECORD)
+        merged = _merge_records(np.concatenate([old, new]))
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + np.array([len(merged), generation], dtype="<u8").tobytes())
+            f.write(merged.tobytes())
+        # Windows 無法取代仍被映射的檔案，先釋放自己的 memmap；失敗時把紀錄放回 log
+        self.records, self.keys, self._stat = None, None, None
+        try:
+            os.replace(tmp, self.path)
+        except OSError:
+            os.remove(tmp)
+            with open(self.log_path, "ab") as f:
+                f.write(new.tobytes())
+            os.remove(merging)
+            self.refresh()
+            return False
+        os.remove(merging)
+        self.pending.clear()
+        self.refresh()
+        return True
+
+def _merge_records(records):
+    merged = {}
+    for key, score, visits, wins, move, depth, kind in records.tolist():
+        slot = (key, kind, move)
+        if slot not in merged:
+            merged[slot] = [key, score, visits, wins, move, depth, kind]
+        elif kind == KIND_BOOK:
+            merged[slot][2] += visits
+            merged[slot][3] += wins
+        elif depth >= merged[slot][5]:
+            merged[slot] = [key, score, visits, wins, move, depth, kind]
+    rows = [tuple(row) for _, row in sorted(merged.items())]
+    return np.array(rows, dtype=RECORD)
@@ -0,0 +1,263 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from ai_gomoku import (BLACK, BOARD_SIZE, EMPTY, LINE_INDEX, LINE_LENGTHS, PATTERN_TABLE, WHITE,
+                       PatternTable, evaluate_boards)
+
+CELLS = BOARD_SIZE * BOARD_SIZE
+
+# 5x5 鄰域的位移與權重（相鄰一圈 2、外圈 1），與 ai_gomoku 的候選點前緣一致
+NEIGHBOR_OFFSETS = [(dx, dy, 2 if max(abs(dx), abs(dy)) == 1 else 1)
+                    for dx in range(-2, 3) for dy in range(-2, 3) if dx or dy]
+
+def _build_line_neighbors():
+    # 每格四個方向上距離 2 以內的格子，AI 落子後對手的應手一定包含這些點
+    table = []
+    for x in range(BOARD_SIZE):
+        for y in range(BOARD_SIZE):
+            cells = []
+            for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                for k in (-2, -1, 1, 2):
+                    nx, ny = x + dx * k, y + dy * k
+                    if 0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE:
+                        cells.append(nx * BOARD_SIZE + ny)
+            table.append(cells)
+    return table
+
+LINE_NEIGHBORS = _build_line_neighbors()
+
+# 所有連續五格的窗口 (窗口數, 5)，用來一次找出各局「下一手就成五」的空格
+FIVE_WINDOWS = np.array([LINE_INDEX[line, start:start + 5]
+                         for line, length in enumerate(LINE_LENGTHS) for start in range(length - 4)])
+
+def five_completion_cells(boards, color):
+    # 回傳 (棋局編號, 格子) 兩個陣列：該格落下 color 就成五（窗口內已有四子、剩一格空）
+    windows = boards[:, FIVE_WINDOWS]
+    hits = ((windows == color).sum(axis=-1) == 4) & ((windows == EMPTY).sum(axis=-1) == 1)
+    games, window_ids = np.nonzero(hits)
+    empty = windows[games, window_ids] == EMPTY
+    return games, FIVE_WINDOWS[window_ids][empty]
+
+# 多局對弈服務：所有棋局的盤面疊成一個 (capacity, 225) 的 uint8 陣列，
+# 各 session 的要求先排隊，step() 時一次處理：所有棋局的候選點與葉節點盤面
+# 疊成批次，用 NumPy 查表評分（兩層：AI 著法 × 對手應手），再各自取極小極大。
+class GomokuEngine:
+    def __init__(self, capacity=1024, max_candidates=24, top_moves=6, replies=8, batch_size=4096, patterns=None):
+        self.capacity = capacity
+        self.max_candidates = max_candidates
+        self.top_moves = top_moves
+        self.replies = replies
+        self.batch_size = batch_size
+        self.table = PatternTable(patterns) if patterns else PATTERN_TABLE
+        self.cells = np.zeros((capacity, CELLS), dtype=np.uint8)
+        self.sessions = {}
+        self.histories = {}
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self.pending = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self._worker = None
+        self._running = False
+        self.served = 0
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def new_game(self, session_id):
+        with self.lock:
+            if session_id in self.sessions:
+                slot = self.sessions[session_id]
+            else:
+                if not self.free_slots:
+                    raise RuntimeError("棋局數已達上限")
+                slot = self.free_slots.pop()
+                self.sessions[session_id] = slot
+            self.cells[slot] = EMPTY
+            self.histories[session_id] = []
+        return slot
+
+    def end_game(self, session_id):
+        with self.lock:
+            slot = self.sessions.pop(session_id, None)
+            self.histories.pop(session_id, None)
+            if slot is not None:
+                self.cells[slot] = EMPTY
+                self.free_slots.append(slot)
+
+    def apply_json_move(self, session_id, move_json):
+        color = WHITE if move_json["玩家棋子顏色"] == "白子" else BLACK
+        x_str, y_str = move_json["下的格子"].split("之")
+        idx = (int(x_str) - 1) * BOARD_SIZE + (int(y_str) - 1)
+        with self.lock:
+            slot = self.sessions[session_id]
+            if self.cells[slot, idx] != EMPTY:
+                return False
+            self.cells[slot, idx] = color
+            self.histories[session_id].append(idx)
+        return True
+
+    def undo_last_two_moves(self, session_id):
+        with self.lock:
+            history = self.histories[session_id]
+            if len(history) < 2:
+                return False
+            for _ in range(2):
+                self.cells[self.sessions[session_id], history.pop()] = EMPTY
+        return True
+
+    # 送出「輪到 AI（白子）下棋」的要求，回傳 Future，結果是與 GomokuAI.get_best_move 相同格式的 dict
+    def submit(self, session_id):
+        future = Future()
+        with self.lock:
+            if session_id not in self.sessions:
+                raise KeyError(session_id)
+            self.pending.append((session_id, future))
+        self.wakeup.set()
+        return future
+
+    def get_best_moves(self, session_ids):
+        futures = {session_id: self.submit(session_id) for session_id in session_ids}
+        if self._worker is None:
+            while self.pending:
+                self.step()
+        return {session_id: future.result() for session_id, future in futures.items()}
+
+    def step(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+            slots = [self.sessions[session_id] for session_id, _ in batch]
+            boards = self.cells[slots].copy()
+        if not batch:
+            return 0
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            moves = self._search(boards)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            raise
+        for (_, future), idx in zip(batch, moves):
+            x, y = divmod(int(idx), BOARD_SIZE)
+            future.set_result({"玩家棋子顏色": "白子", "下的格子": f"{x + 1}之{y + 1}"})
+        self.cpu_seconds += time.process_time() - cpu
+        self.wall_seconds += time.perf_counter() - wall
+        self.served += len(batch)
+        return len(batch)
+
+    def start(self, max_wait_ms=5):
+        if self._worker is not None:
+            return
+        self._running = True
+        self._worker = threading.Thread(target=self._serve, args=(max_wait_ms,), daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        self._running = False
+        self.wakeup.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def _serve(self, max_wait_ms):
+        while self._running:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            # 稍等一下讓同一時間到達的要求併成同一批
+            time.sleep(max_wait_ms / 1000)
+            while self.pending:
+                self.step()
+
+    # 每個 CPU 秒（也就是每核心每秒）回應的 AI 落子數
+    def stats(self):
+        return {
+            "sessions": len(self.sessions),
+            "served": self.served,
+            "cpu_seconds": self.cpu_seconds,
+            "wall_seconds": self.wall_seconds,
+            "games_per_second_per_core": self.served / self.cpu_seconds if self.cpu_seconds else 0.0,
+        }
+
+    def _evaluate(self, boards):
+        scores = np.empty(len(boards), dtype=np.int64)
+        for start in range(0, len(boards), self.batch_size):
+            chunk = boards[start:start + self.batch_size]
+            scores[start:start + len(chunk)] = evaluate_boards(chunk, WHITE, self.table)
+        return scores
+
+    def _search(self, boards):
+        count = len(boards)
+        grid = (boards.reshape(count, BOARD_SIZE, BOARD_SIZE) != EMPTY).astype(np.int16)
+        padded = np.pad(grid, ((0, 0), (2, 2), (2, 2)))
+        near = np.zeros_like(grid)
+        for dx, dy, weight in NEIGHBOR_OFFSETS:
+            near += weight * padded[:, 2 + dx:2 + dx + BOARD_SIZE, 2 + dy:2 + dy + BOARD_SIZE]
+        near = near.reshape(count, CELLS)
+        near[boards != EMPTY] = 0
+
+        # 白子直接成五與擋下黑子成五的點一定要列入候選，這些點的鄰近權重可能很低，不能被上限截掉
+        urgent = [[] for _ in range(count)]
+        for color in (WHITE, BLACK):
+            for g, cell in zip(*five_completion_cells(boards, color)):
+                urgent[g].append(int(cell))
+
+        # 第一層：每局前 max_candidates 個候選點（另加上必要的點），分別評估白子、黑子落在該點後的盤面
+        base = self._evaluate(boards)
+        candidates = []
+        for g in range(count):
+            cells = np.flatnonzero(near[g])
+            if len(cells) > self.max_candidates:
+                cells = cells[np.argsort(-near[g, cells], kind="stable")[:self.max_candidates]]
+            if urgent[g]:
+                extra = np.setdiff1d(np.array(urgent[g], dtype=np.intp), cells)
+                cells = np.concatenate([cells, extra])
+            candidates.append(cells)
+        owners = np.repeat(np.arange(count), [len(c) for c in candidates])
+        cells = np.concatenate(candidates) if count else np.zeros(0, dtype=np.intp)
+        white_leaves = boards[owners]
+        white_leaves[np.arange(len(cells)), cells] = WHITE
+        black_leaves = boards[owners]
+        black_leaves[np.arange(len(cells)), cells] = BLACK
+        attack = self._evaluate(white_leaves) - base[owners]
+        defence = base[owners] - self._evaluate(black_leaves)
+        priority = attack + defence
+
+        # 第二層：每局取 top_moves 個白子著法，對每手展開 replies 個黑子應手（加上該手附近的點）
+        leaves, leaf_owner = [], []
+        plans = []
+        offset = 0
+        for g, cand in enumerate(candidates):
+            n = len(cand)
+            if n == 0:
+                plans.append(None)
+                continue
+            prio = priority[offset:offset + n]
+            order = np.argsort(-prio, kind="stable")
+            moves = cand[order[:self.top_moves]]
+            reply_pool = cand[order[:self.replies + 1]].tolist()
+            plan = []
+            for move in moves.tolist():
+                replies = [r for r in reply_pool if r != move][:self.replies]
+                replies += [r for r in LINE_NEIGHBORS[move] if boards[g, r] == EMPTY and r not in replies]
+                plan.append((move, len(leaves), len(replies)))
+                for reply in replies:
+                    leaf = boards[g].copy()
+                    leaf[move] = WHITE
+                    leaf[reply] = BLACK
+                    leaves.append(leaf)
+                    leaf_owner.append(g)
+            plans.append(plan)
+            offset += n
+        leaf_scores = self._evaluate(np.array(leaves)) if leaves else np.zeros(0, dtype=np.int64)
+
+        best = np.full(count, (BOARD_SIZE // 2) * BOARD_SIZE + BOARD_SIZE // 2)
+        for g, plan in enumerate(plans):
+            if not plan:
+                continue
+            best_score = None
+            for move, start, n in plan:
+                score = leaf_scores[start:start + n].min() if n else 0
+                if best_score is None or score > best_score:
+                    best_score, best[g] = score, move
+        return best
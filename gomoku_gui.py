@@ -1,7 +1,7 @@
 import tkinter as tk
 import threading
 from tkinter import messagebox, scrolledtext
-from main import ask_type, ask_gomoku_type, run_once_and_return_json
+from main import ask_type, ask_gomoku_type, run_once_and_return_json, BOOK_PATH
 from ai_gomoku import GomokuAI
 
 CELL_SIZE = 50
@@ -11,7 +11,7 @@ class GomokuGame:
     def __init__(self, root, ai_enabled):
         self.root = root
         self.ai_enabled = ai_enabled
-        self.ai = GomokuAI()
+        self.ai = GomokuAI(book_path=BOOK_PATH)
         self.loading = False
         self.is_listening = False
 
@@ -92,6 +92,7 @@ class GomokuGame:
         self.append_textbox(f"{who} 下在：{move_json['下的格子']}")
         x_str, y_str = move_json["下的格子"].split("之")
         if self.ai.check_win(int(x_str), int(y_str)):
+            self.ai.record_game(self.ai.state.get((int(x_str) - 1, int(y_str) - 1)))
             self.show_auto_close_message("遊戲結束", f"🎉 {who} 獲勝！")
             self.root.after(3000, self.reset_board)
             return True
@@ -140,12 +141,14 @@ class GomokuGame:
                         ai_move = self.ai.get_best_move()
                         if self.apply_and_check_win(ai_move, is_ai=True):
                             return
+                        # 玩家思考、語音辨識期間在背景預想下一手
+                        self.ai.start_pondering()
         finally:
+            self.ai.stop_pondering()
             self.is_listening = False
 
     def reset_board(self):
-        self.ai.state.clear()
-        self.ai.history.clear()
+        self.ai.reset()
         self.update_board()
         self.move_textbox.delete("1.0", tk.END)
         self.append_textbox("🎙️ 已重置棋盤，準備進入新局...")
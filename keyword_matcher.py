@@ -0,0 +1,139 @@
+from collections import deque
+from functools import lru_cache
+
+# 所有指令詞彙集中在這裡，編譯成一個 Aho-Corasick 自動機；串列順序就是優先順序
+# （與原本逐一 `in` 檢查時「先列先贏」的行為相同）。
+FURNITURE = ["椅子", "電腦桌", "電腦椅", "電腦", "餐桌", "沙發", "花瓶", "床", "立燈"]
+ACTIONS = {
+    "放置": ["放", "擺"],
+    "移除": ["拿掉", "移除", "去掉", "丟掉"],
+    "移動": ["移", "挪", "靠", "搬"],
+    "轉向": ["轉", "轉向", "旋轉"],
+}
+DIRECTIONS = ["左", "右", "前", "後", "上", "下", "中間", "旁邊"]
+DISTANCES = ["一點點", "稍微", "一點", "多一點", "很多"]
+ANGLES = ["90度", "180度", "45度", "270度"]
+POSITIONS = ["左上角", "左下角", "右上角", "右下角", "中間"]
+GAME_CONTROLS = {
+    "重新開始": ["再來", "再一局", "重新開始", "再玩一次"],
+    "終止遊戲": ["不玩", "退出", "結束", "關掉"],
+    "悔棋": ["悔棋", "倒退", "反悔", "上一步"],
+}
+# 規則快速路徑（command_grammar）用到的棋子顏色、落子動詞，以及不影響語意的贅字
+COLORS = ["黑子", "白子"]
+MOVE_WORDS = ["下在", "放在", "落在", "下到", "放到", "下", "放", "落", "走"]
+FILLERS = ["我要", "我想", "請", "幫我", "把", "往", "到", "在", "的", "了", "吧", "啦", "一下",
+           "遊戲", "一局", "回", "我", "再", "給我"]
+# 語音辨識常見的錯字
+ASR_FIXES = {
+    "黑紙": "黑子", "白紙": "白子",
+    "黑紫": "黑子", "白紫": "白子",
+    "黑棋": "黑子", "白棋": "白子",
+}
+
+# 關鍵字自動機：add() 登記 (關鍵字, 類別, 值)，compile() 建立失敗連結後，
+# 一次掃描就能找出文字中所有（可重疊的）關鍵字，掃描時間只和文字長度與命中數有關。
+class KeywordMatcher:
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.entries = []  # (keyword, category, value, rank)
+        self.compiled = False
+
+    def add(self, keyword, category, value=None, rank=0):
+        state = 0
+        for ch in keyword:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = nxt
+        self.output[state].append(len(self.entries))
+        self.entries.append((keyword, category, keyword if value is None else value, rank))
+        self.compiled = False
+
+    def compile(self):
+        queue = deque(self.goto[0].values())
+        for state in queue:
+            self.fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+        self.compiled = True
+        self.extract.cache_clear()
+
+    # 產生 (起點, 終點, entry 編號)，依終點排序
+    def scan(self, text):
+        if not self.compiled:
+            self.compile()
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for entry_id in output[state]:
+                yield i + 1 - len(self.entries[entry_id][0]), i + 1, entry_id
+
+    # 回傳 {類別: [值, ...]}，每個類別的值依 rank 排序且不重複
+    @lru_cache(maxsize=512)
+    def extract(self, text):
+        found = {}
+        for _, _, entry_id in self.scan(text):
+            _, category, value, rank = self.entries[entry_id]
+            found.setdefault(category, {}).setdefault(value, rank)
+        return {category: [v for v, _ in sorted(values.items(), key=lambda item: item[1])]
+                for category, values in found.items()}
+
+    # 把 category 類別的關鍵字換成它的值；重疊時取最左、再取最長，效果同依序 str.replace
+    def replace(self, text, category):
+        matches = sorted(((start, -end, entry_id) for start, end, entry_id in self.scan(text)
+                          if self.entries[entry_id][1] == category))
+        if not matches:
+            return text
+        parts, pos = [], 0
+        for start, neg_end, entry_id in matches:
+            if start < pos:
+                continue
+            parts.append(text[pos:start])
+            parts.append(self.entries[entry_id][2])
+            pos = -neg_end
+        parts.append(text[pos:])
+        return "".join(parts)
+
+def _add_list(matcher, category, words):
+    for rank, word in enumerate(words):
+        matcher.add(word, category, rank=rank)
+
+def build_command_matcher():
+    matcher = KeywordMatcher()
+    _add_list(matcher, "furniture", FURNITURE)
+    _add_list(matcher, "direction", DIRECTIONS)
+    _add_list(matcher, "distance", DISTANCES)
+    _add_list(matcher, "angle", ANGLES)
+    _add_list(matcher, "position", POSITIONS)
+    for rank, (action, words) in enumerate(ACTIONS.items()):
+        for word in words:
+            matcher.add(word, "action", action, rank)
+    for rank, (command, words) in enumerate(GAME_CONTROLS.items()):
+        for word in words:
+            matcher.add(word, "game_control", command, rank)
+    _add_list(matcher, "color", COLORS)
+    _add_list(matcher, "move", MOVE_WORDS)
+    _add_list(matcher, "filler", FILLERS)
+    for wrong, right in ASR_FIXES.items():
+        matcher.add(wrong, "fix", right)
+    matcher.compile()
+    return matcher
+
+COMMAND_MATCHER = build_command_matcher()
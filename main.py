@@ -1,26 +1,86 @@
-import pyaudio
-import wave
-import webrtcvad
-from faster_whisper import WhisperModel
 import json
-import collections
 import re
-from bert_command_classifier import BertCommandClassifier
+import threading
+from time import perf_counter
+from audio_input import MicrophoneSource, VadSegmenter, pcm_to_float32, write_wav
 from ai_gomoku import GomokuAI
+from model_registry import ModelRegistry
+from keyword_matcher import COMMAND_MATCHER
+from command_grammar import parse_command
+from command_bus import CommandBus
 from datetime import time
 
-AUDIO_PATH = "record_temp.wav"
+# 設成檔名（例如 "record_temp.wav"）時，每段語音會另存一份 WAV 供除錯；平常不寫檔
+DEBUG_WAV_PATH = None
+# 串流模式：說話的同時就在背景辨識目前為止的語音，結尾靜音只需 STREAM_PADDING_MS
+STREAMING_ASR = True
+STREAM_PADDING_MS = 600
+PARTIAL_INTERVAL_MS = 450
+# 分層辨識：每段語音先用 tiny 模型，平均 log 機率太低、no_speech 機率太高，
+# 或指令解析不接受時，才改用 medium 模型重新辨識
+ASR_CASCADE = True
+ASR_MIN_AVG_LOGPROB = -0.7
+ASR_MAX_NO_SPEECH_PROB = 0.6
+# BERT 分類器後端："torch"（原本的全精度模型）或 "onnx"（int8 量化 + ONNX Runtime）。
+# 先跑 `python bert_command_classifier.py compare` 確認標籤一致與延遲，記下結果後再改成 "onnx"
+BERT_BACKEND = "torch"
+BERT_THREADS = None
+# 提早離開：用 `python bert_command_classifier.py fit-exits 語料.jsonl` 訓練中間層分類頭後設成 True；
+# 需要逐層前向，因此會改用 torch 後端。BERT_EXIT_THRESHOLD 為 None 時使用校準出的各層門檻
+BERT_EARLY_EXIT = False
+BERT_EXIT_THRESHOLD = None
+# 規則快速路徑：文法解析沒有歧義且信心值達到門檻時直接產生指令，不跑 BERT
+FAST_PATH = True
+FAST_PATH_MIN_CONFIDENCE = 0.9
 JSON_OUTPUT_PATH = "output_bert.json"
 TYPE_OUTPUT_PATH = "type.json"
+# 指令與模式透過 command_bus 即時推送給 Unity；上面兩個檔案改為原子寫入的備援檔
+COMMAND_TOPIC = "command"
+TYPE_TOPIC = "type"
+BOOK_PATH = "opening_book.bin"
 
-print("載入 Faster-Whisper 模型...")
-whisper_model = WhisperModel("medium", device="cpu", compute_type="int8")
-print("✅ Faster-Whisper 載入完成。")
-print("載入 BERT 分類器...")
-bert_classifier = BertCommandClassifier("best_model")
-print("✅ BERT 分類器載入完成。")
+# 模型改為延遲載入：import main 不再等模型，介面可以先出現；
+# 第一次用到時才載入，或呼叫 models.warm_up() 在背景預先載入
+def load_whisper():
+    from faster_whisper import WhisperModel
+    return WhisperModel("medium", device="cpu", compute_type="int8")
 
-gomoku_ai = GomokuAI()
+def load_whisper_tiny():
+    from faster_whisper import WhisperModel
+    return WhisperModel("tiny", device="cpu", compute_type="int8")
+
+def load_bert():
+    from bert_command_classifier import BertCommandClassifier
+    if BERT_EARLY_EXIT:
+        return BertCommandClassifier("best_model", "torch", BERT_THREADS,
+                                     early_exit=True, exit_threshold=BERT_EXIT_THRESHOLD)
+    if BERT_BACKEND == "torch":
+        return BertCommandClassifier("best_model", "torch", BERT_THREADS)
+    try:
+        return BertCommandClassifier("best_model", BERT_BACKEND, BERT_THREADS)
+    except Exception as e:
+        # 沒有安裝 onnxruntime，或匯出、量化、建立 session 失敗時都退回 PyTorch
+        print(f"⚠️ 無法使用 {BERT_BACKEND} 後端（{e}），改用 torch")
+        return BertCommandClassifier("best_model", "torch", BERT_THREADS)
+
+MODEL_NAMES = {"whisper_tiny": "Faster-Whisper tiny 模型", "whisper": "Faster-Whisper 模型", "bert": "BERT 分類器"}
+
+def print_model_progress(name, status, seconds):
+    if status == "loading":
+        print(f"載入 {MODEL_NAMES.get(name, name)}...")
+    elif status == "ready":
+        print(f"✅ {MODEL_NAMES.get(name, name)} 載入完成（{seconds:.1f} 秒）。")
+    else:
+        print(f"⚠️ {MODEL_NAMES.get(name, name)} 載入失敗。")
+
+models = ModelRegistry()
+models.register("whisper_tiny", load_whisper_tiny)
+models.register("bert", load_bert)
+models.register("whisper", load_whisper)
+models.add_listener(print_model_progress)
+
+gomoku_ai = GomokuAI(book_path=BOOK_PATH)
+bus = CommandBus({COMMAND_TOPIC: JSON_OUTPUT_PATH, TYPE_TOPIC: TYPE_OUTPUT_PATH})
 ai_enabled = True
 
 zh_to_arabic = {
@@ -41,72 +101,162 @@ def normalize_coordinate(match):
     return f"{int(left_num)}之{int(right_num)}"
 
 def normalize_text(text):
-    text = (
-        text.replace("黑紙", "黑子")
-            .replace("白紙", "白子")
-            .replace("黑紫", "黑子")
-            .replace("白紫", "白子")
-            .replace("黑棋", "黑子")
-            .replace("白棋", "白子")
-    )
+    text = COMMAND_MATCHER.replace(text, "fix")
     text = mixed_pattern.sub(normalize_coordinate, text)
     return text
 
-def record_and_segment(out_path=AUDIO_PATH):
-    FORMAT = pyaudio.paInt16
-    CHANNELS = 1
-    RATE = 16000
-    CHUNK_DURATION_MS = 30
-    PADDING_DURATION_MS = 1500
-    CHUNK_SIZE = int(RATE * CHUNK_DURATION_MS / 1000)
-    NUM_PADDING_CHUNKS = int(PADDING_DURATION_MS / CHUNK_DURATION_MS)
-    vad = webrtcvad.Vad(2)
-
-    audio = pyaudio.PyAudio()
-    stream = audio.open(format=FORMAT, channels=CHANNELS,
-                        rate=RATE, input=True, frames_per_buffer=CHUNK_SIZE)
+segmenter = VadSegmenter(2)
+# None 表示每次錄音時開啟麥克風；可換成 audio_input 的 WAV 檔、資料夾重播或合成音源
+audio_source = None
+
+# 錄到的語音直接以 16 kHz float32 NumPy 陣列交給 Whisper，不經過暫存檔。
+# on_audio(voiced, speech_end) 會在觸發後的每個音框呼叫，speech_end 是最後一個有聲音框結束的位元組位置。
+def record_and_segment(debug_path=None, padding_ms=1500, on_audio=None, source=None):
+    debug_path = DEBUG_WAV_PATH if debug_path is None else debug_path
+    source = audio_source if source is None else source
+    owned = source is None
+    if owned:
+        source = MicrophoneSource()
     print(" 開始錄音，請說話...（Ctrl+C結束）")
 
+    voiced = bytearray()
     try:
-        ring_buffer = collections.deque(maxlen=NUM_PADDING_CHUNKS)
-        triggered = False
-        voiced_frames = []
-        while True:
-            frame = stream.read(CHUNK_SIZE, exception_on_overflow=False)
-            is_speech = vad.is_speech(frame, RATE)
-            if not triggered:
-                ring_buffer.append((frame, is_speech))
-                num_voiced = len([f for f, speech in ring_buffer if speech])
-                if num_voiced > 0.8 * ring_buffer.maxlen:
-                    triggered = True
-                    voiced_frames.extend([f for f, s in ring_buffer])
-                    ring_buffer.clear()
-            else:
-                voiced_frames.append(frame)
-                ring_buffer.append((frame, is_speech))
-                num_unvoiced = len([f for f, speech in ring_buffer if not speech])
-                if num_unvoiced > 0.8 * ring_buffer.maxlen:
-                    print("偵測到靜音，自動存檔")
-                    wf = wave.open(out_path, 'wb')
-                    wf.setnchannels(CHANNELS)
-                    wf.setsampwidth(audio.get_sample_size(FORMAT))
-                    wf.setframerate(RATE)
-                    wf.writeframes(b''.join(voiced_frames))
-                    wf.close()
-                    break
+        voiced = segmenter.segment(source, on_audio, padding_ms)
+        if voiced:
+            print("偵測到靜音，結束這段語音")
     except KeyboardInterrupt:
         print("錄音手動結束。")
     finally:
-        stream.stop_stream()
-        stream.close()
-        audio.terminate()
+        if owned:
+            source.close()
         print("錄音已結束。")
+    if debug_path and voiced:
+        write_wav(debug_path, voiced)
+    return pcm_to_float32(voiced)
+
+# 辨識統計：各模型的呼叫次數與耗時，以及分層辨識升級到大模型的次數與原因
+asr_stats = {
+    "utterances": 0,
+    "escalated": 0,
+    "reasons": {"no_speech": 0, "low_logprob": 0, "rejected": 0},
+    "calls": {},
+    "seconds": {},
+}
+asr_stats_lock = threading.Lock()
+
+def get_asr_stats():
+    with asr_stats_lock:
+        stats = json.loads(json.dumps(asr_stats))
+    stats["escalation_rate"] = stats["escalated"] / stats["utterances"] if stats["utterances"] else 0.0
+    return stats
+
+def transcribe(audio, model="whisper", **options):
+    if audio.size == 0:
+        return []
+    start = perf_counter()
+    segments_generator, _ = models.get(model).transcribe(audio, language="zh", **options)
+    segments = list(segments_generator)
+    with asr_stats_lock:
+        asr_stats["calls"][model] = asr_stats["calls"].get(model, 0) + 1
+        asr_stats["seconds"][model] = asr_stats["seconds"].get(model, 0.0) + perf_counter() - start
+    return segments
+
+def first_asr_model():
+    return "whisper_tiny" if ASR_CASCADE else "whisper"
+
+# tiny 模型的結果是否需要交給 medium 重新辨識，不需要時回傳 None
+def escalation_reason(segments, accept=None):
+    if not segments:
+        return "no_speech"
+    if max(s.no_speech_prob for s in segments) > ASR_MAX_NO_SPEECH_PROB:
+        return "no_speech"
+    if sum(s.avg_logprob for s in segments) / len(segments) < ASR_MIN_AVG_LOGPROB:
+        return "low_logprob"
+    if accept is not None and not accept(normalize_text(segments[0].text)):
+        return "rejected"
+    return None
+
+# segments 是第一層（tiny）已經算好的結果（例如串流模式的最後一次暫時結果），沒有時在這裡辨識
+def recognize(audio, segments=None, accept=None, **options):
+    if audio.size == 0:
+        return []
+    if segments is None:
+        segments = transcribe(audio, first_asr_model(), **options)
+    if not ASR_CASCADE:
+        return segments
+    reason = escalation_reason(segments, accept)
+    with asr_stats_lock:
+        asr_stats["utterances"] += 1
+        if reason is not None:
+            asr_stats["escalated"] += 1
+            asr_stats["reasons"][reason] += 1
+    if reason is None:
+        return segments
+    print(f"（tiny 模型結果不可靠：{reason}，改用 medium 模型）")
+    return transcribe(audio, "whisper", **options)
+
+# 邊錄邊辨識：每隔 PARTIAL_INTERVAL_MS 把目前的語音快照交給背景執行緒解碼，並以 on_partial 回報暫時結果。
+# 語音結束時，若最後一次解碼已涵蓋所有有聲音框就直接採用，否則交給 recognize 補做一次完整解碼。
+# 回傳 (語音, 第一層辨識結果或 None)。
+def transcribe_streaming(on_partial=None, **options):
+    cond = threading.Condition()
+    state = {"pending": None, "inflight": 0, "segments": None, "covered": 0, "finished": False,
+             "posted": 0, "speech_end": 0}
+    interval_bytes = int(16000 * 2 * PARTIAL_INTERVAL_MS / 1000)
+
+    def on_audio(voiced, speech_end):
+        state["speech_end"] = speech_end
+        # 只有新的有聲音框才值得重新解碼；結尾靜音期間不再送出快照
+        if speech_end > state["posted"] and len(voiced) - state["posted"] >= interval_bytes:
+            with cond:
+                state["pending"] = (bytes(voiced[:speech_end]), speech_end)
+                cond.notify()
+            state["posted"] = speech_end
+
+    def worker():
+        while True:
+            with cond:
+                while state["pending"] is None and not state["finished"]:
+                    cond.wait()
+                if state["finished"]:
+                    return
+                chunk, covered = state["pending"]
+                state["pending"] = None
+                state["inflight"] = covered
+            segments = transcribe(pcm_to_float32(chunk), first_asr_model(), **options)
+            with cond:
+                state["segments"], state["covered"] = segments, covered
+                cond.notify_all()
+            if segments and on_partial is not None:
+                on_partial(normalize_text("".join(s.text for s in segments)))
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    audio = record_and_segment(padding_ms=STREAM_PADDING_MS, on_audio=on_audio)
+    speech_end = state["speech_end"]
+    if speech_end:
+        audio = audio[:speech_end // 2]
+    with cond:
+        state["finished"] = True
+        cond.notify_all()
+        # 正在解碼的快照已包含全部語音時，等它完成即可
+        while state["covered"] < speech_end <= state["inflight"] and thread.is_alive():
+            cond.wait()
+        if state["segments"] is not None and state["covered"] >= speech_end:
+            return audio, state["segments"]
+    return audio, None
+
+# accept(text) 是指令解析的檢查，回傳 False 時分層辨識會改用大模型
+def listen(accept=None, **options):
+    if STREAMING_ASR:
+        audio, segments = transcribe_streaming(on_partial=lambda text: print("（辨識中）", text), **options)
+    else:
+        audio, segments = record_and_segment(), None
+    return recognize(audio, segments, accept, **options)
 
 def ask_type():
     print("請說明你要執行的操作（例如：我要控制家具、我要下五子棋）...")
-    record_and_segment(AUDIO_PATH)
-    segments_generator, _ = whisper_model.transcribe(AUDIO_PATH, language="zh")
-    segments = list(segments_generator)
+    segments = listen(accept=lambda text: any(k in text for k in ("家具", "五子棋", "下棋")))
     if segments:
         text = normalize_text(segments[0].text)
         if "家具" in text:
@@ -119,15 +269,12 @@ def ask_type():
         print("無法辨識語音，默認為五子棋")
         mode = "gomoku"
 
-    with open(TYPE_OUTPUT_PATH, "w", encoding="utf-8") as f:
-        json.dump({"type": mode}, f, ensure_ascii=False, indent=2)
+    bus.publish(TYPE_TOPIC, {"type": mode})
     return mode
 
 def ask_gomoku_type():
     print("請問是雙人對戰還是人機對戰？")
-    record_and_segment(AUDIO_PATH)
-    segments_generator, _ = whisper_model.transcribe(AUDIO_PATH, language="zh")
-    segments = list(segments_generator)
+    segments = listen(accept=lambda text: any(k in text for k in ("雙人", "兩人", "人機", "電腦", "AI")))
     if segments:
         text = normalize_text(segments[0].text)
         if "雙人" in text or "兩人" in text:
@@ -136,11 +283,66 @@ def ask_gomoku_type():
     print("未偵測到有效輸出，預設為人機對戰")
     return True
 
+fast_path_stats = {
+    "utterances": 0,
+    "hits": 0,
+    "ambiguous": 0,
+    "low_confidence": 0,
+    "no_parse": 0,
+    "bert_calls": 0,
+    "bert_ms": 0.0,
+}
+fast_path_lock = threading.Lock()
+
+def get_fast_path_stats():
+    with fast_path_lock:
+        stats = dict(fast_path_stats)
+    stats["hit_rate"] = stats["hits"] / stats["utterances"] if stats["utterances"] else 0.0
+    # 每次命中省下一次 BERT 推論，以實際量到的平均推論時間估計省下的延遲
+    bert_ms_mean = stats["bert_ms"] / stats["bert_calls"] if stats["bert_calls"] else None
+    stats["bert_ms_mean"] = bert_ms_mean
+    stats["saved_ms_estimate"] = stats["hits"] * bert_ms_mean if bert_ms_mean is not None else None
+    return stats
+
+# 回傳 (類別編號, 指令 JSON 或 None)；先走規則快速路徑，解析失敗、有歧義或信心不足才交給 BERT
+def classify_command(text):
+    if FAST_PATH:
+        status, label, command, confidence = parse_command(text)
+        if status == "parsed" and confidence < FAST_PATH_MIN_CONFIDENCE:
+            status = "low_confidence"
+        with fast_path_lock:
+            fast_path_stats["utterances"] += 1
+            fast_path_stats["hits" if status == "parsed" else status] += 1
+        if status == "parsed":
+            print(f"（規則快速路徑，信心 {confidence:.2f}）")
+            return label, command
+
+    bert_classifier = models.get("bert")
+    start = perf_counter()
+    label = bert_classifier.predict_label(text)
+    with fast_path_lock:
+        fast_path_stats["bert_calls"] += 1
+        fast_path_stats["bert_ms"] += (perf_counter() - start) * 1000
+    if label == 1:
+        return label, bert_classifier.to_gomoku_json(text)
+    elif label == 2:
+        return label, bert_classifier.to_game_control_json(text)
+    elif label == 3:
+        return label, bert_classifier.to_furniture_control_json(text)
+    return label, None
+
 def run_once_and_return_json():
-    record_and_segment(AUDIO_PATH)
-    segments_generator, _ = whisper_model.transcribe(
-        AUDIO_PATH,
-        language="zh",
+    # 同一句話在分層辨識的檢查與最後的解析只分類一次
+    results = {}
+
+    def classify(text):
+        if text not in results:
+            results[text] = classify_command(text)
+        return results[text]
+
+    # 判定不是指令時，視為 tiny 模型可能聽錯，交給大模型再辨識一次
+    segments = listen(
+        accept=lambda text: classify(text)[0] != 0,
         initial_prompt= (
         "這是一個語音指令系統，包含家具控制與五子棋。"
         "玩家會說出像是「黑子下在三之三」、「白子放在五之七」這類語句。"
@@ -148,30 +350,23 @@ def run_once_and_return_json():
         "關鍵詞還有：悔棋、回上一步、結束遊戲、重開遊戲"
         ))
 
-    segments = list(segments_generator)
-
     if not segments:
         print("無語音內容")
         return None
 
     text = normalize_text(segments[0].text)
-    label = bert_classifier.predict_label(text)
+    label, command = classify(text)
     print(f"指令類型:label = {label}")
 
     if label == 0:
         print("非指令語句：", text)
         return None
-    elif label == 1:
-        return bert_classifier.to_gomoku_json(text)
-    elif label == 2:
-        return bert_classifier.to_game_control_json(text)
-    elif label == 3:
-        return bert_classifier.to_furniture_control_json(text)
-
-    return None
+    return command
 
 def main():
     print("=== Whisper + BERT 指令辨識系統啟動 ===")
+    models.warm_up()
+    bus.start()
     mode = ask_type()
 
     if mode == "furniture":
@@ -185,19 +380,29 @@ def main():
             print("\n🎤 請說出語音指令...")
             result = run_once_and_return_json()
             if result is not None:
-                with open(JSON_OUTPUT_PATH, "w", encoding="utf-8") as f:
-                    json.dump(result, f, ensure_ascii=False, indent=2)
-                print("指令已寫入 JSON：", result)
+                bus.publish(COMMAND_TOPIC, result)
+                print("指令已送出：", result)
 
-                # 🧠 AI 對手回合（若啟用）
-                if mode == "gomoku" and ai_enabled:
+                # 🧠 AI 對手回合（若啟用）：玩家的落子要先同步到 AI 棋盤，預想的結果才對得上
+                if mode == "gomoku" and ai_enabled and "玩家棋子顏色" in result:
+                    if not gomoku_ai.apply_json_move(result):
+                        continue
                     ai_move = gomoku_ai.get_best_move()
                     gomoku_ai.apply_json_move(ai_move)
-                    with open(JSON_OUTPUT_PATH, "w", encoding="utf-8") as f:
-                        json.dump(ai_move, f, ensure_ascii=False, indent=2)
-                    print("AI 已下棋並更新 JSON：", ai_move)
+                    # 玩家與 AI 的落子是兩則有序的訊息，AI 的落子不會蓋掉 Unity 還沒處理的玩家落子
+                    bus.publish(COMMAND_TOPIC, ai_move)
+                    print("AI 已下棋並送出：", ai_move)
+                    # 等待玩家下一句語音時，在背景先搜尋可能的回應
+                    gomoku_ai.start_pondering()
     except KeyboardInterrupt:
         print("使用者中止，程式結束")
+    finally:
+        gomoku_ai.stop_pondering()
+        bus.close()
+        print("語音辨識統計：", get_asr_stats())
+        print("規則快速路徑統計：", get_fast_path_stats())
+        if BERT_EARLY_EXIT and models.is_ready("bert"):
+            print("BERT 提早離開統計：", models.get("bert").get_exit_stats())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,83 @@
+import threading
+import time
+
+# 模型登錄表：登記載入函式，第一次 get() 時才載入，或用 warm_up() 在背景執行緒依序預先載入。
+# 同一個模型只會載入一次，背景載入中被 get() 到時會等它完成；載入耗時記在 load_seconds。
+class ModelRegistry:
+    def __init__(self):
+        self.factories = {}
+        self.models = {}
+        self.status = {}
+        self.errors = {}
+        self.load_seconds = {}
+        self.listeners = []
+        self._locks = {}
+
+    def register(self, name, factory):
+        self.factories[name] = factory
+        self.status[name] = "pending"
+        self._locks[name] = threading.Lock()
+
+    # callback(name, status, seconds)：status 為 "loading"、"ready" 或 "failed"
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def _notify(self, name, status, seconds=None):
+        self.status[name] = status
+        for callback in list(self.listeners):
+            try:
+                callback(name, status, seconds)
+            except Exception as e:
+                print(f"⚠️ 載入進度回呼失敗：{e}")
+
+    def is_ready(self, name):
+        return name in self.models
+
+    def get(self, name):
+        model = self.models.get(name)
+        if model is not None:
+            return model
+        with self._locks[name]:
+            if name in self.models:
+                return self.models[name]
+            self._notify(name, "loading")
+            start = time.perf_counter()
+            try:
+                model = self.factories[name]()
+            except Exception as e:
+                self.errors[name] = e
+                self._notify(name, "failed", time.perf_counter() - start)
+                raise
+            self.load_seconds[name] = time.perf_counter() - start
+            self.models[name] = model
+            self.errors.pop(name, None)
+            self._notify(name, "ready", self.load_seconds[name])
+        return model
+
+    def warm_up(self, names=None, on_progress=None):
+        names = list(self.factories) if names is None else list(names)
+        if on_progress is not None:
+            self.add_listener(on_progress)
+            # 已經載入好的模型也回報一次，讓介面顯示正確狀態
+            for name in names:
+                if self.is_ready(name):
+                    on_progress(name, "ready", self.load_seconds[name])
+
+        def run():
+            try:
+                for name in names:
+                    try:
+                        self.get(name)
+                    except Exception:
+                        pass  # 錯誤已記在 errors，真正用到時 get() 會再試一次並丟出
+            finally:
+                if on_progress is not None:
+                    self.remove_listener(on_progress)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,71 @@
+import random
+import time
+
+import numpy as np
+
+from ai_gomoku import (BLACK, BOARD_SIZE, EMPTY, WHITE, Board, GomokuAI, PatternTable, Search, WIN_SCORE,
+                       evaluate_line, evaluate_boards, get_lines, pattern_scores, verify_pattern_table)
+
+def random_position(seed, low=8, high=24):
+    rng = random.Random(seed)
+    ai = GomokuAI(max_depth=8, tt_mb=4)
+    cells = set()
+    target = rng.randint(low, high)
+    while len(cells) < target:
+        cells.add((rng.randint(4, 10), rng.randint(4, 10)))
+    for i, (x, y) in enumerate(cells):
+        ai.state.make_move(x, y, BLACK if i % 2 == 0 else WHITE)
+    return ai
+
+# 威脅空間搜尋也要受整體時間預算限制，並留時間給一般搜尋至少完成一層
+def test_search_respects_time_budget():
+    budget_ms = 100
+    for seed in range(6):
+        ai = random_position(seed)
+        start = time.perf_counter()
+        ai.get_best_move(time_budget_ms=budget_ms)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        assert elapsed_ms < budget_ms * 2.5
+        if ai.last_search["source"] == "search":
+            assert ai.last_search["depth"] >= 1
+
+# 查表評分必須和原本的字串評分逐盤一致
+def test_pattern_table_matches_string_scorer():
+    assert verify_pattern_table(samples=300, seed=1)
+
+def test_custom_pattern_table_matches_string_scorer():
+    patterns = {pattern: value * 3 + 7 for pattern, value in pattern_scores.items()}
+    assert verify_pattern_table(samples=100, seed=2, table=PatternTable(patterns))
+
+def test_batched_evaluation_matches_string_scorer():
+    rng = np.random.default_rng(3)
+    grids = np.where(rng.random((64, BOARD_SIZE, BOARD_SIZE)) < 0.4,
+                     rng.integers(BLACK, WHITE + 1, (64, BOARD_SIZE, BOARD_SIZE)), EMPTY)
+    scores = evaluate_boards(grids.reshape(64, -1).astype(np.uint8), WHITE)
+    for grid, score in zip(grids, scores):
+        lines = get_lines(grid)
+        expected = (sum(evaluate_line(line, WHITE) for line in lines)
+                    - sum(evaluate_line(line, BLACK) for line in lines))
+        assert int(score) == expected
+
+# 停止背景預想發生在回應玩家之前、時間預算之外，威脅搜尋途中也要能立即中止
+def test_stop_pondering_returns_promptly():
+    for seed in range(10):
+        ai = random_position(seed)
+        ai.start_pondering()
+        time.sleep(0.02)
+        start = time.perf_counter()
+        ai.stop_pondering()
+        assert (time.perf_counter() - start) * 1000 < 50
+
+# 活四的兩端遠離盤上密集的區域，鄰近權重低；限制候選數時也不能漏掉擋五／成五的點
+def test_candidate_cap_keeps_five_cells():
+    board = Board()
+    for y in range(3, 7):
+        board.make_move(2, y, BLACK)
+    for i, (x, y) in enumerate((x, y) for x in range(9, 13) for y in range(9, 13)):
+        if i % 3:
+            board.make_move(x, y, WHITE if (x + y) % 2 else BLACK)
+    capped = Search(max_candidates=6).minimax(board, 2, float('-inf'), float('inf'), True)
+    full = Search().minimax(board, 2, float('-inf'), float('inf'), True)
+    assert capped[0] == full[0] <= -WIN_SCORE
@@ -0,0 +1,61 @@
+import json
+import socket
+
+from command_bus import CommandBus
+
+def read_messages(conn, count):
+    data = b""
+    while data.count(b"\n") < count:
+        data += conn.recv(4096)
+    return [json.loads(line) for line in data.splitlines()]
+
+# 和 CommandBusReader 相同的規則：第一次連上以 hello 當起點，之後依 seq 去重
+def deliver(messages, topic, skip_existing):
+    hello, last_seq, delivered = messages[0], 0, []
+    assert hello["hello"]
+    if skip_existing or topic not in hello["latest"]:
+        last_seq = hello["seq"]
+    else:
+        last_seq = hello["latest"][topic] - 1
+    for message in messages[1:]:
+        if message["topic"] == topic and message["seq"] > last_seq:
+            last_seq = message["seq"]
+            delivered.append(message["payload"])
+    return delivered
+
+def connect(bus):
+    conn = socket.create_connection(bus.server.getsockname())
+    conn.settimeout(2)
+    return conn
+
+# 晚連上的讀取端先收到 hello 與各主題最近的訊息，再接著收新的
+def test_new_reader_receives_hello_and_recent_messages():
+    bus = CommandBus(port=0)
+    assert bus.start()
+    try:
+        bus.publish("gomoku", {"下的格子": "8之8"})
+        bus.publish("furniture", {"動作": "移動"})
+        with connect(bus) as conn:
+            first = read_messages(conn, 3)
+            bus.publish("gomoku", {"下的格子": "8之9"})
+            second = read_messages(conn, 1)
+        assert first[0] == {"session": bus.session, "seq": 2, "hello": True, "latest": {"gomoku": 1, "furniture": 2}}
+        assert [m["seq"] for m in first[1:] + second] == [1, 2, 3]
+    finally:
+        bus.close()
+
+# 補送的舊指令不能被剛啟動的讀取端再執行一次：skipExisting 全部略過，否則只執行最新的一則
+def test_late_reader_does_not_rerun_old_commands():
+    bus = CommandBus(port=0)
+    assert bus.start()
+    try:
+        for step in range(5):
+            bus.publish("command", {"指令": f"往右移一點 {step}"})
+        with connect(bus) as conn:
+            messages = read_messages(conn, 6)
+            bus.publish("command", {"指令": "往左移一點"})
+            messages += read_messages(conn, 1)
+        assert deliver(messages, "command", skip_existing=True) == [{"指令": "往左移一點"}]
+        assert deliver(messages, "command", skip_existing=False) == [{"指令": "往右移一點 4"}, {"指令": "往左移一點"}]
+    finally:
+        bus.close()
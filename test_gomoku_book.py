@@ -0,0 +1,69 @@
+import glob
+import os
+
+import numpy as np
+
+from gomoku_book import KIND_BOOK, LEGACY_MAGIC, RECORD, OpeningBook, _try_lock, _unlock
+
+# 被強制終止的行程留下的 .lock 檔不能讓之後的 compact() 永遠失敗
+def test_compact_ignores_lock_file_left_by_dead_process(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = OpeningBook(path)
+    open(book.lock_path, "w").close()
+    book.add(42, 112, KIND_BOOK, visits=3, wins=2)
+    assert book.compact()
+    assert OpeningBook(path).probe_book(42) == 112
+
+def test_compact_skips_while_lock_is_held(tmp_path):
+    book = OpeningBook(str(tmp_path / "book.bin"))
+    book.add(42, 112, KIND_BOOK, visits=3, wins=2)
+    fd = os.open(book.lock_path, os.O_CREAT | os.O_RDWR)
+    try:
+        assert _try_lock(fd)
+        assert not book.compact()
+        _unlock(fd)
+    finally:
+        os.close(fd)
+    assert book.compact()
+
+# 合併到一半被中止時留下的 .merging 紀錄：主檔還沒替換就要在下次 compact() 併入
+def test_compact_recovers_interrupted_merge(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = OpeningBook(path)
+    book.add(7, 50, KIND_BOOK, visits=3, wins=3)
+    merging = f"{book.log_path}.merging.{book.generation + 1}"
+    os.replace(book.log_path, merging)
+    book.add(8, 60, KIND_BOOK, visits=3, wins=3)
+    assert book.compact()
+    fresh = OpeningBook(path)
+    assert fresh.probe_book(7) == 50 and fresh.probe_book(8) == 60
+    assert not os.path.exists(merging)
+
+# 主檔已替換、只差刪掉 .merging 時被中止，下次 compact() 不能再累加一次
+def test_compact_skips_merge_already_in_book(tmp_path):
+    path = str(tmp_path / "book.bin")
+    book = OpeningBook(path)
+    book.add(7, 50, KIND_BOOK, visits=3, wins=2)
+    with open(book.log_path, "rb") as f:
+        folded = f.read()
+    assert book.compact()
+    with open(f"{book.log_path}.merging.{book.generation}", "wb") as f:
+        f.write(folded)
+    book.add(8, 60, KIND_BOOK, visits=3, wins=3)
+    assert book.compact()
+    visits, wins = next((v, w) for _, _, v, w, move, _, _ in OpeningBook(path).entries(7) if move == 50)
+    assert (visits, wins) == (3, 2)
+    assert not glob.glob(glob.escape(book.log_path) + ".merging.*")
+
+# 沒有世代欄位的舊格式主檔照樣讀得到，compact() 後改寫成新格式
+def test_reads_legacy_header(tmp_path):
+    path = str(tmp_path / "book.bin")
+    records = np.array([(7, 0.0, 3, 3, 50, 0, KIND_BOOK)], dtype=RECORD)
+    with open(path, "wb") as f:
+        f.write(LEGACY_MAGIC + np.array([1], dtype="<u8").tobytes() + records.tobytes())
+    book = OpeningBook(path)
+    assert book.probe_book(7) == 50 and book.generation == 0
+    book.add(8, 60, KIND_BOOK, visits=3, wins=3)
+    assert book.compact()
+    fresh = OpeningBook(path)
+    assert fresh.generation == 1 and fresh.probe_book(7) == 50 and fresh.probe_book(8) == 60
@@ -0,0 +1,21 @@
+from gomoku_engine import GomokuEngine
+
+def play(engine, session_id, white, black):
+    engine.new_game(session_id)
+    for cell in white:
+        engine.apply_json_move(session_id, {"玩家棋子顏色": "白子", "下的格子": cell})
+    for cell in black:
+        engine.apply_json_move(session_id, {"玩家棋子顏色": "黑子", "下的格子": cell})
+
+# 活四的空端鄰近權重低，曾被 max_candidates 截掉而錯過一步成五
+def test_completes_five_beyond_candidate_cap():
+    engine = GomokuEngine(capacity=2)
+    play(engine, "g", ["3之4", "3之5", "3之6", "3之7"], ["8之4", "8之5", "8之6", "8之7"])
+    move = engine.get_best_moves(["g"])["g"]
+    assert move["下的格子"] in ("3之3", "3之8")
+
+def test_blocks_opponent_five():
+    engine = GomokuEngine(capacity=2)
+    play(engine, "g", ["12之12", "13之4"], ["8之4", "8之5", "8之6", "8之7", "1之1"])
+    move = engine.get_best_moves(["g"])["g"]
+    assert move["下的格子"] in ("8之3", "8之8")
@@ -2,7 +2,7 @@ import tkinter as tk
 import threading
 import math
 from tkinter import messagebox, scrolledtext
-from main import ask_type, ask_gomoku_type, run_once_and_return_json, normalize_text
+from main import ask_type, ask_gomoku_type, run_once_and_return_json, normalize_text, models, MODEL_NAMES
 from ai_gomoku import GomokuAI
 from gomoku_gui import GomokuGame
 
@@ -152,6 +152,22 @@ def restart_game(old_root=None):
         old_root.destroy()
     root = tk.Tk()
     root.title("語音系統")
+    # 視窗先出現，模型在背景載入，載入進度顯示在最下方
+    status_label = tk.Label(root, text="", font=("Arial", 10), fg="#666")
+    status_label.pack(side=tk.BOTTOM, fill=tk.X)
+
+    def show_progress(name, status, seconds):
+        text = {"loading": "⏳ 載入{}中...", "ready": "✅ {}已就緒", "failed": "⚠️ {}載入失敗"}[status]
+        text = text.format(MODEL_NAMES.get(name, name))
+        if seconds is not None:
+            text += f"（{seconds:.1f} 秒）"
+        try:
+            status_label.config(text=text)
+        except tk.TclError:
+            pass
+
+    models.warm_up(on_progress=show_progress)
+    root.update()
     mode = gui_ask_type(root)
     if mode == "gomoku":
         ai_flag = gui_ask_gomoku_type(root)